@@ -1,9 +1,76 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import uuid
+from typing import Dict, List, Optional
 
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.celery_app import celery_app
+from app.core.tasks import bulk_send, get_group_status, send_email_task
 from app.schemas.email_schema import EmailRequest, EmailResponse
-from app.services.email.email_service import email_service, EmailServiceError
+from app.services.email.email_service import get_email_service, EmailServiceError
+from app.utils.ndjson import stream_ndjson
+from app.utils.responses import ORJSONResponse
+
+router = APIRouter(prefix="/email", tags=["Email"], default_response_class=ORJSONResponse)
+
+
+def _task_status(task_id: str, meta: dict) -> dict:
+    """Build a task status payload from Celery result-backend metadata"""
+    result = meta.get("result")
+    if isinstance(result, BaseException):
+        result = str(result)
+    return {
+        "task_id": task_id,
+        "status": meta.get("status", "PENDING"),
+        "result": result
+    }
+
+
+def _fetch_task_status(task_id: str, wait: Optional[float] = None) -> dict:
+    """Read a task's status, optionally blocking on the result backend until it is ready"""
+    if wait:
+        try:
+            celery_app.AsyncResult(task_id).get(timeout=wait, propagate=False)
+        except CeleryTimeoutError:
+            pass
+    return _task_status(task_id, celery_app.backend.get_task_meta(task_id))
+
+
+# Status lookups shared by concurrent pollers: task_id -> lookup
+_status_lookups: Dict[str, asyncio.Task] = {}
+
+# How long a non-terminal status is reused for repeat polls
+STATUS_COALESCE_WINDOW = 0.2
+
+TERMINAL_TASK_STATES = frozenset(("SUCCESS", "FAILURE", "REVOKED"))
+
+# Most task ids accepted by one /tasks lookup
+MAX_TASK_STATUS_IDS = 100
+
+
+def _forget_status_lookup(task_id: str, lookup: asyncio.Task) -> None:
+    """Drop a finished lookup unless a newer one has replaced it"""
+    if _status_lookups.get(task_id) is lookup:
+        del _status_lookups[task_id]
+
 
-router = APIRouter(prefix="/email", tags=["Email"])
+def _on_status_lookup_done(task_id: str, lookup: asyncio.Task) -> None:
+    """Expire terminal or failed lookups now and transient ones after the coalesce window"""
+    if lookup.cancelled() or lookup.exception() or lookup.result()["status"] in TERMINAL_TASK_STATES:
+        _forget_status_lookup(task_id, lookup)
+    else:
+        asyncio.get_running_loop().call_later(STATUS_COALESCE_WINDOW, _forget_status_lookup, task_id, lookup)
+
+
+async def _coalesced_task_status(task_id: str) -> dict:
+    """Share one result-backend lookup between concurrent polls of the same task"""
+    lookup = _status_lookups.get(task_id)
+    if lookup is None:
+        lookup = _status_lookups[task_id] = asyncio.create_task(asyncio.to_thread(_fetch_task_status, task_id))
+        lookup.add_done_callback(lambda done: _on_status_lookup_done(task_id, done))
+    return await asyncio.shield(lookup)
 
 
 @router.post("/send", response_model=EmailResponse)
@@ -12,24 +79,123 @@ async def send_email(email_request: EmailRequest):
     Send email with optimized performance
     """
     try:
-        result = await email_service.send_email(email_request)
-        return result
+        result = await get_email_service().send_email(email_request)
+        # Already in the EmailResponse shape, so skip FastAPI's response_model serialization
+        return ORJSONResponse(result)
     except EmailServiceError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
 
+@router.post("/send/async")
+def send_email_async(email_request: EmailRequest):
+    """
+    Queue an email for background delivery and return its task id
+    """
+    # The id is fixed before publishing, so /email/task/{task_id} resolves immediately
+    task_id = uuid.uuid4().hex
+    try:
+        send_email_task.apply_async(args=[email_request.model_dump(mode='json')], task_id=task_id)
+        return {
+            "task_id": task_id,
+            "status": "queued"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue email: {str(e)}")
+
+
+@router.post("/send/bulk")
+def send_bulk_email(email_requests: List[EmailRequest]):
+    """
+    Queue a batch of emails for background delivery
+    """
+    try:
+        group_result = bulk_send(send_email_task, [email_request.model_dump(mode='json') for email_request in email_requests])
+        return {
+            "group_id": group_result.id,
+            "count": len(group_result.results),
+            "task_ids": [result.id for result in group_result.results],
+            "status": "queued"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue email batch: {str(e)}")
+
+
+@router.get("/task/{task_id}")
+async def get_email_task_status(task_id: str, wait: Optional[float] = Query(None, gt=0, le=60)):
+    """
+    Get the status of a queued email task, optionally waiting up to `wait` seconds for it to finish
+    """
+    try:
+        if wait:
+            return await asyncio.to_thread(_fetch_task_status, task_id, wait)
+        return await _coalesced_task_status(task_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve task status: {str(e)}")
+
+
+@router.get("/tasks")
+def get_email_tasks_status(ids: str):
+    """
+    Get the status of several queued email tasks with a single result-backend round trip
+    """
+    task_ids = [task_id.strip() for task_id in ids.split(",") if task_id.strip()]
+    if not task_ids:
+        # MGET with no keys is a Redis error
+        return {"count": 0, "tasks": []}
+    if len(task_ids) > MAX_TASK_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TASK_STATUS_IDS} task ids per request")
+    try:
+        backend = celery_app.backend
+        values = backend.client.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+        return {
+            "count": len(task_ids),
+            "tasks": [
+                _task_status(task_id, backend.decode_result(value) if value else {})
+                for task_id, value in zip(task_ids, values)
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve task statuses: {str(e)}")
+
+
+@router.get("/group/{group_id}")
+def get_email_group_status(group_id: str):
+    """
+    Get the status of a queued email batch
+    """
+    try:
+        status = get_group_status(group_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve batch status: {str(e)}")
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Batch {group_id} not found")
+    return status
+
+
 @router.get("/logs")
-def get_email_logs(days: int = None):
+def get_email_logs(response: Response, days: int = None):
     """
     Get email logs from CSV
     """
     try:
-        logs = email_service.get_email_logs(days)
+        logs, cache_hit = get_email_service().get_email_logs_cached(days)
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return {
             "count": len(logs),
             "logs": logs
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve email logs: {str(e)}")
+
+
+@router.get("/logs/stream")
+def stream_email_logs(days: int = None):
+    """
+    Stream email logs from CSV as newline-delimited JSON
+    """
+    return StreamingResponse(
+        stream_ndjson(get_email_service().get_email_logs_iter(days)),
+        media_type="application/x-ndjson"
+    )
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from typing import List
 
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+
+from app.core.tasks import bulk_send, get_group_status, send_sms_task
 from app.schemas.sms_schema import SMSRequest, SMSResponse
 from app.services.sms.sms_service import sms_service, SMSServiceError
+from app.utils.ndjson import stream_ndjson
+from app.utils.responses import ORJSONResponse
 
-router = APIRouter(prefix="/sms", tags=["SMS"])
+router = APIRouter(prefix="/sms", tags=["SMS"], default_response_class=ORJSONResponse)
 
 
 @router.post("/send", response_model=SMSResponse)
@@ -20,13 +26,45 @@ async def send_sms(sms_request: SMSRequest):
         raise HTTPException(status_code=500, detail=f"Failed to send SMS: {str(e)}")
 
 
+@router.post("/send/bulk")
+def send_bulk_sms(sms_requests: List[SMSRequest]):
+    """
+    Queue a batch of SMS messages for background delivery
+    """
+    try:
+        group_result = bulk_send(send_sms_task, [sms_request.model_dump(mode='json') for sms_request in sms_requests])
+        return {
+            "group_id": group_result.id,
+            "count": len(group_result.results),
+            "task_ids": [result.id for result in group_result.results],
+            "status": "queued"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue SMS batch: {str(e)}")
+
+
+@router.get("/group/{group_id}")
+def get_sms_group_status(group_id: str):
+    """
+    Get the status of a queued SMS batch
+    """
+    try:
+        status = get_group_status(group_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve batch status: {str(e)}")
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Batch {group_id} not found")
+    return status
+
+
 @router.get("/logs")
-def get_sms_logs(days: int = None):
+def get_sms_logs(response: Response, days: int = None):
     """
     Get SMS logs from CSV
     """
     try:
-        logs = sms_service.get_sms_logs(days)
+        logs, cache_hit = sms_service.get_sms_logs_cached(days)
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return {
             "count": len(logs),
             "logs": logs
@@ -34,3 +72,13 @@ def get_sms_logs(days: int = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve SMS logs: {str(e)}")
 
+
+@router.get("/logs/stream")
+def stream_sms_logs(days: int = None):
+    """
+    Stream SMS logs from CSV as newline-delimited JSON
+    """
+    return StreamingResponse(
+        stream_ndjson(sms_service.get_sms_logs_iter(days)),
+        media_type="application/x-ndjson"
+    )
@@ -1,11 +1,24 @@
+import asyncio
+import threading
+from typing import Optional
+
 from celery import Celery
-from app.core.config import settings
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.core.config import get_settings
+from app.utils.event_loop import new_event_loop
+
+settings = get_settings()
+
+CELERY_BROKER_URL = settings.celery_broker_url
+CELERY_RESULT_BACKEND = settings.celery_result_backend
 
 # Create Celery app
 celery_app = Celery(
     "communication_service",
-    broker=settings.celery_broker_url,
-    backend=settings.celery_result_backend,
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
     include=["app.core.tasks"]
 )
 
@@ -18,12 +31,96 @@ celery_app.conf.update(
     enable_utc=True,
     task_routes={
         "app.core.tasks.send_sms_task": {"queue": "sms"},
+        "app.core.tasks.send_email_task": {"queue": "email"},
         "app.core.tasks.cleanup_logs_task": {"queue": "maintenance"},
     },
     task_default_queue="default",
     task_default_exchange="default",
     task_default_routing_key="default",
+    task_track_started=True,
+    result_expires=3600,
+    task_acks_late=True,
+    worker_prefetch_multiplier=settings.celery_worker_prefetch_multiplier,
+    broker_pool_limit=settings.redis_max_connections,
+    broker_connection_retry_on_startup=True,
+    broker_transport_options={
+        "polling_interval": settings.celery_broker_polling_interval,
+        "max_connections": settings.redis_max_connections,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_socket_connect_timeout,
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+        "visibility_timeout": 3600,
+    },
+    redis_max_connections=settings.redis_max_connections,
+    redis_socket_timeout=settings.redis_socket_timeout,
+    redis_socket_connect_timeout=settings.redis_socket_connect_timeout,
+    redis_socket_keepalive=True,
+    redis_backend_health_check_interval=30,
+    result_backend_transport_options={
+        "max_connections": settings.redis_max_connections,
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+    },
 )
 
+# Periodic tasks (run with `celery -A app.core.celery_app beat`)
+celery_app.conf.beat_schedule = {
+    "cleanup-logs-nightly": {
+        "task": "app.core.tasks.cleanup_logs_task",
+        "schedule": crontab(hour=settings.log_cleanup_hour, minute=0),
+        "options": {"queue": "maintenance"},
+    },
+}
+
+# Event loop shared by every task that runs on a worker thread: the single task thread of
+# prefork/solo pools, or each thread of the threads pool (a loop can't run in two threads at once)
+_worker_loops = threading.local()
+
+
+def _current_worker_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """This thread's worker event loop, if one was created"""
+    return getattr(_worker_loops, "loop", None)
+
+
+@worker_process_init.connect
+def init_worker_loop(**kwargs):
+    """Create the persistent event loop when a worker process starts"""
+    _worker_loops.loop = new_event_loop()
+    asyncio.set_event_loop(_worker_loops.loop)
+
+
+@worker_process_shutdown.connect
+def close_worker_loop(**kwargs):
+    """Close the worker event loop when the process shuts down"""
+    loop = _current_worker_loop()
+    if loop is not None and not loop.is_closed():
+        from app.services.email.email_service import close_email_service
+        from app.services.sms.sms_service import sms_service
+
+        loop.run_until_complete(close_email_service())
+        loop.run_until_complete(sms_service.close())
+        loop.close()
+    _worker_loops.loop = None
+
+
+@worker_process_shutdown.connect
+def flush_worker_logs(**kwargs):
+    """Write out buffered CSV log rows, pool children exit without running atexit hooks"""
+    from app.utils.csv_logger import flush_all_logs
+
+    flush_all_logs()
+
+
+def run_in_worker_loop(coro):
+    """Run a coroutine to completion on the worker's persistent event loop"""
+    loop = _current_worker_loop()
+    if loop is None or loop.is_closed():
+        # Solo/threads pools, eager mode and each new pool thread start without a loop
+        init_worker_loop()
+        loop = _worker_loops.loop
+    return loop.run_until_complete(coro)
+
+
 if __name__ == "__main__":
     celery_app.start()
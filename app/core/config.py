@@ -1,4 +1,5 @@
 import os
+from functools import cached_property, lru_cache
 from typing import Optional
 from pydantic_settings import BaseSettings
 
@@ -8,6 +9,8 @@ class Settings(BaseSettings):
     app_name: str = "Communication Service"
     app_version: str = "1.0.0"
     debug: bool = True
+    health_cache_ttl: int = 30  # Seconds a /health result is reused between polls
+    api_thread_pool_tokens: int = 200  # Concurrent sync endpoints/threadpool calls (AnyIO default is 40)
 
     # SMS API Settings
     sms_api_url: str
@@ -29,44 +32,62 @@ class Settings(BaseSettings):
     redis_socket_timeout: int = 5
     redis_socket_connect_timeout: int = 5
 
-    # Construct Redis URLs dynamically
-    @property
+    # Construct Redis URLs once, on first access
+    @cached_property
     def redis_url(self) -> str:
         auth = f":{self.redis_password}@" if self.redis_password else ""
         return f"redis://{auth}{self.redis_host}:{self.redis_port}/{self.redis_db}"
 
-    @property
+    @cached_property
     def celery_broker_url(self) -> str:
         return self.redis_url
 
-    @property
+    @cached_property
     def celery_result_backend(self) -> str:
         return self.redis_url
 
+    # Celery Worker Settings
+    celery_worker_prefetch_multiplier: int = 1  # Tasks reserved per worker process
+    celery_broker_polling_interval: float = 0.5  # Redis broker polling interval in seconds
+    trust_producer_payload: bool = True  # Skip re-validating task payloads our own API already validated
+
     # Logging Settings
     logs_directory: str = "app/logs"
-    sms_log_file: str = "sms_logs.csv"
-    email_log_file: str = "email_logs.csv"
+    sms_log_file: str = "sms_logs.csv"  # Rotated daily as sms_logs-YYYY-MM-DD.csv
+    email_log_file: str = "email_logs.csv"  # Rotated daily as email_logs-YYYY-MM-DD.csv
     log_retention_days: int = 7
+    log_cleanup_hour: int = 3  # UTC hour of the nightly Celery Beat log cleanup
     log_level: str = "INFO"
+    logs_cache_ttl: int = 300  # Seconds a parsed log query is served from memory (its `days` cutoff ages by as much)
+    logs_cache_max_entries: int = 32  # Distinct `days` queries kept per log file
+    logs_read_block_size: int = 1 << 20  # Bytes per record batch when pyarrow reads a log file
+    log_flush_batch_size: int = 100  # Buffered log rows that trigger an immediate write
+    log_flush_interval: float = 1.0  # Seconds between background flushes of buffered log rows
+    log_fsync: bool = False  # fdatasync the log file once per flushed batch (off: rely on the OS page cache)
 
     # SMS Service Performance Settings
-    sms_rate_limit: int = 10  # Max concurrent SMS requests
+    sms_rate_limit: int = 10  # Max SMS requests per second (token bucket, bursts up to this many)
     sms_timeout: float = 30.0  # Request timeout in seconds
     sms_retry_attempts: int = 3  # Number of retry attempts
     sms_circuit_breaker_threshold: int = 5  # Failures before circuit breaker opens
     sms_circuit_breaker_timeout: int = 60  # Circuit breaker timeout in seconds
+    sms_circuit_breaker_success_threshold: int = 2  # Half-open probe successes before the breaker closes
+    trust_sms_api_response: bool = True  # Skip validating the SMS API's fixed response schema (False catches upstream drift)
 
     # Email Service Performance Settings
-    email_rate_limit: int = 5  # Max concurrent email requests
+    email_rate_limit: int = 5  # Email send queue holds 4x this many pending messages per event loop
     email_retry_attempts: int = 3  # Number of retry attempts
     email_circuit_breaker_threshold: int = 3  # Failures before circuit breaker opens
     email_circuit_breaker_timeout: int = 60  # Circuit breaker timeout in seconds
+    email_smtp_pool_size: int = 5  # SMTP worker coroutines (one connection each) per event loop
+    email_smtp_timeout: float = 30.0  # SMTP connect/command timeout in seconds
+    email_smtp_idle_probe: float = 30.0  # Idle seconds after which a pooled SMTP session is NOOP-checked before use
 
     # HTTP Client Settings
     http_max_connections: int = 100
     http_max_keepalive_connections: int = 20
     http_connect_timeout: float = 10.0
+    http_keepalive_expiry: float = 15.0  # Seconds an idle pooled connection is kept (httpx default is 5)
 
     # CORS Settings
     cors_origins: str = "http://localhost:3000,http://localhost:8080,http://localhost:8002"
@@ -88,6 +109,7 @@ class Settings(BaseSettings):
     sms_queue: str = "user.otp.sms.queue"
     email_routing_key: str = "otp.email.send"
     sms_routing_key: str = "otp.sms.send"
+    otp_send_timeout: float = 60.0  # Seconds a consumer waits for an OTP send before nacking
 
     class Config:
         env_file = ".env"
@@ -95,4 +117,10 @@ class Settings(BaseSettings):
         extra = "ignore"  # Allow extra fields from environment
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the process-wide settings instance"""
+    return Settings()
+
+
+settings = get_settings()
@@ -1,9 +1,15 @@
-import asyncio
 import logging
+from typing import Iterable, Optional
 
-from app.core.celery_app import celery_app
+from celery import group
+from celery.result import GroupResult
+
+from app.core.celery_app import celery_app, run_in_worker_loop
+from app.core.config import settings
 from app.services.sms.sms_service import sms_service, SMSServiceError
+from app.services.email.email_service import get_email_service, EmailServiceError
 from app.schemas.sms_schema import SMSRequest
+from app.schemas.email_schema import EmailRequest
 from app.utils.csv_logger import cleanup_all_logs
 
 # Configure logging (fallback to standard logging if structlog not available)
@@ -14,71 +20,91 @@ except ImportError:
     logger = logging.getLogger(__name__)
 
 
+def _task_error_payload(data: dict, status: str) -> dict:
+    """Build the result a send task returns when delivery fails"""
+    return {"to": data.get("to", ""), "status": status}
+
+
+def bulk_send(task, payloads: Iterable[dict]) -> GroupResult:
+    """
+    Fan a batch out as a Celery group of one task per payload
+
+    All group members are published over a single pooled producer, and the
+    group result is saved so it can be restored later by its id.
+    """
+    with celery_app.producer_pool.acquire(block=True) as producer:
+        group_result = group(task.s(payload) for payload in payloads).apply_async(producer=producer)
+    group_result.save()
+    return group_result
+
+
+def get_group_status(group_id: str) -> Optional[dict]:
+    """Summarize the state of a saved task group, or None if the group is unknown"""
+    group_result = GroupResult.restore(group_id, app=celery_app)
+    if group_result is None:
+        return None
+
+    tasks = [{"task_id": result.id, "status": result.state} for result in group_result.results]
+    statuses = [task["status"] for task in tasks]
+    return {
+        "group_id": group_id,
+        "count": len(tasks),
+        "successful": statuses.count("SUCCESS"),
+        "failed": statuses.count("FAILURE"),
+        "tasks": tasks
+    }
+
+
 @celery_app.task(bind=True, name="app.core.tasks.send_sms_task")
 def send_sms_task(self, sms_data: dict) -> dict:
     """
     Task to send SMS with error handling
     """
     try:
-        sms_request = SMSRequest(**sms_data)
-
-        # Handle event loop safely
-        try:
-            # Try to get existing loop
-            loop = asyncio.get_running_loop()
-            # If we get here, there's a running loop, so we need to run the coroutine differently
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, sms_service.send_sms(sms_request))
-                result = future.result()
-        except RuntimeError:
-            # No running loop, safe to create new one
-            result = asyncio.run(sms_service.send_sms(sms_request))
-
-        logger.info("SMS task completed successfully",
-                   task_id=self.request.id,
-                   rec_id=result.recId,
-                   to=result.to)
+        if settings.trust_producer_payload:
+            sms_request = SMSRequest.model_construct(**sms_data)
+        else:
+            sms_request = SMSRequest(**sms_data)
+
+        result = run_in_worker_loop(sms_service.send_sms(sms_request))
+
+        logger.info(f"SMS task {self.request.id} completed successfully for {result.to}")
 
         return {
-            "recId": result.recId,
-            "status": result.status,
-            "sent_at": result.sent_at.isoformat(),
             "to": result.to,
-            "text": result.text,
-            "from_number": result.from_number
+            "status": result.status
         }
 
     except SMSServiceError as e:
-        logger.error("SMS service error in task",
-                    task_id=self.request.id,
-                    error=str(e),
-                    to=sms_data.get("to", ""))
-        return {
-            "recId": 0,
-            "status": f"SMS Service Error: {str(e)}",
-            "sent_at": None,
-            "to": sms_data.get("to", ""),
-            "text": sms_data.get("text", ""),
-            "from_number": sms_data.get("from_number", "")
-        }
+        logger.error(f"SMS service error in task {self.request.id}: {str(e)}")
+        return _task_error_payload(sms_data, f"SMS Service Error: {str(e)}")
     except Exception as e:
-        logger.error("Unexpected error in SMS task",
-                    task_id=self.request.id,
-                    error=str(e),
-                    to=sms_data.get("to", ""))
-        return {
-            "recId": 0,
-            "status": f"Task failed: {str(e)}",
-            "sent_at": None,
-            "to": sms_data.get("to", ""),
-            "text": sms_data.get("text", ""),
-            "from_number": sms_data.get("from_number", "")
-        }
+        logger.error(f"Unexpected error in SMS task {self.request.id}: {str(e)}")
+        return _task_error_payload(sms_data, f"Task failed: {str(e)}")
 
 
+@celery_app.task(bind=True, name="app.core.tasks.send_email_task")
+def send_email_task(self, email_data: dict) -> dict:
+    """
+    Task to send email with error handling
+    """
+    try:
+        if settings.trust_producer_payload:
+            email_request = EmailRequest.model_construct(**email_data)
+        else:
+            email_request = EmailRequest(**email_data)
+        result = run_in_worker_loop(get_email_service().send_email(email_request))
 
+        logger.info(f"Email task {self.request.id} completed successfully for {result['to']}")
 
+        return result
+
+    except EmailServiceError as e:
+        logger.error(f"Email service error in task {self.request.id}: {str(e)}")
+        return _task_error_payload(email_data, f"Email Service Error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in email task {self.request.id}: {str(e)}")
+        return _task_error_payload(email_data, f"Task failed: {str(e)}")
 
 
 @celery_app.task(bind=True, name="app.core.tasks.cleanup_logs_task")
@@ -88,10 +114,8 @@ def cleanup_logs_task(self):
     """
     try:
         cleanup_all_logs()
-        logger.info("Log cleanup task completed successfully", task_id=self.request.id)
+        logger.info(f"Log cleanup task {self.request.id} completed successfully")
         return {"status": "success", "message": "Logs cleaned up successfully"}
     except Exception as e:
-        logger.error("Log cleanup task failed",
-                    task_id=self.request.id,
-                    error=str(e))
+        logger.error(f"Log cleanup task {self.request.id} failed: {str(e)}")
         return {"status": "error", "message": f"Failed to cleanup logs: {str(e)}"}
@@ -1,15 +1,19 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
+import time
+import anyio.to_thread
 
 from app.core.config import settings
 from app.api.v1.routes.sms import router as sms_router
 from app.api.v1.routes.email import router as email_router
 from app.core.tasks import cleanup_logs_task
+from app.services.email.email_service import get_email_service, close_email_service
 from app.services.otp.otp_consumer import otp_consumer_service
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from app.services.sms.sms_service import sms_service
+from app.utils.csv_logger import flush_all_logs
+from app.utils.responses import ORJSONResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,8 +24,15 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
-    logger.info("FastAPI server started - scheduler available via manual triggers")
+    logger.info("FastAPI server started - periodic log cleanup runs on Celery Beat")
     
+    # Sync endpoints run in AnyIO's thread pool, raise its limit so bursts don't queue behind 40 threads
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.api_thread_pool_tokens
+
+    # Start SMTP workers and the pooled SMS HTTP client on the API event loop
+    await get_email_service().start()
+    await sms_service.start()
+
     # Start OTP consumer service
     try:
         logger.info("Starting OTP consumer service...")
@@ -41,21 +52,46 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error stopping OTP consumer service: {e}")
 
+    try:
+        await close_email_service()
+        logger.info("SMTP workers stopped")
+    except Exception as e:
+        logger.error(f"Error stopping SMTP workers: {e}")
+
+    try:
+        await sms_service.close()
+        logger.info("SMS HTTP client closed")
+    except Exception as e:
+        logger.error(f"Error closing SMS HTTP client: {e}")
+
+    try:
+        flush_all_logs()
+    except Exception as e:
+        logger.error(f"Error flushing CSV logs: {e}")
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     debug=settings.debug,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
+# Starlette checks each request origin with `in`, so a frozenset keeps that lookup O(1)
+ORIGINS = frozenset(
+    origin.strip() for origin in (settings.cors_origins or "http://localhost:3000,http://localhost:8080").split(",")
+    if origin.strip()
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins.split(",") if hasattr(settings, 'cors_origins') and settings.cors_origins else ["http://localhost:3000", "http://localhost:8080"],
+    allow_origins=ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
 # Include routers
@@ -76,19 +112,33 @@ async def root():
     }
 
 
+# Last health check result, reused for settings.health_cache_ttl seconds
+_HEALTH_CACHE = {"ts": 0.0, "payload": None}
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(response: Response):
     """
     Health check endpoint
     """
+    # Monitors must always reach this process rather than an upstream cache
+    response.headers["Cache-Control"] = "no-store"
+
+    now = time.monotonic()
+    if _HEALTH_CACHE["payload"] is not None and now - _HEALTH_CACHE["ts"] < settings.health_cache_ttl:
+        return _HEALTH_CACHE["payload"]
+
     otp_consumer_healthy = otp_consumer_service.is_healthy()
-    
-    return {
+
+    payload = {
         "status": "healthy" if otp_consumer_healthy else "degraded",
         "service": settings.app_name,
         "version": settings.app_version,
         "otp_consumer": "healthy" if otp_consumer_healthy else "unhealthy"
     }
+    _HEALTH_CACHE["ts"] = now
+    _HEALTH_CACHE["payload"] = payload
+    return payload
 
 
 @app.post("/maintenance/cleanup-logs")
@@ -97,8 +147,8 @@ async def manual_cleanup_logs(background_tasks: BackgroundTasks):
     Manually trigger log cleanup
     """
     try:
-        # Run cleanup in background
-        cleanup_logs_task.delay()
+        # Publishing to the broker is blocking socket I/O, keep it off the event loop
+        await anyio.to_thread.run_sync(cleanup_logs_task.delay)
 
         return {
             "message": "Log cleanup task has been queued",
@@ -112,10 +162,15 @@ async def manual_cleanup_logs(background_tasks: BackgroundTasks):
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=settings.debug
+        loop="uvloop",
+        http="httptools",
+        reload=settings.debug,
+        # Same knob as the container (WEB_CONCURRENCY); every worker runs the lifespan and its own OTP consumer
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
     )
@@ -17,6 +17,16 @@ class RabbitMQConfig(BaseSettings):
     connection_attempts: int = int(os.getenv("RABBITMQ_CONNECTION_ATTEMPTS", "3"))
     retry_delay: float = float(os.getenv("RABBITMQ_RETRY_DELAY", "2.0"))
     heartbeat: int = int(os.getenv("RABBITMQ_HEARTBEAT", "600"))
+
+    # Consumer settings
+    consumers_per_queue: int = int(os.getenv("RABBITMQ_CONSUMERS_PER_QUEUE", "1"))  # Each gets its own connection and thread
+    handler_workers: int = int(os.getenv("RABBITMQ_HANDLER_WORKERS", "8"))  # Threads processing delivered OTP messages
+    prefetch_count: int = int(os.getenv("RABBITMQ_PREFETCH_COUNT", "0"))  # Unacked deliveries per consumer channel, 0 = 2x handler_workers
+    ack_batch_size: int = int(os.getenv("RABBITMQ_ACK_BATCH_SIZE", "8"))  # Acks sent as one multiple=True ack, keep below prefetch
+    ack_flush_interval: float = float(os.getenv("RABBITMQ_ACK_FLUSH_INTERVAL", "0.1"))  # Max seconds an ack waits for its batch
+    reconnect_initial_backoff: float = float(os.getenv("RABBITMQ_RECONNECT_INITIAL_BACKOFF", "0.1"))  # First delay after a consumer fails, doubled per failure
+    reconnect_max_backoff: float = float(os.getenv("RABBITMQ_RECONNECT_MAX_BACKOFF", "30.0"))  # Cap on the consumer reconnect delay
+    reconnect_reset_after: float = float(os.getenv("RABBITMQ_RECONNECT_RESET_AFTER", "10.0"))  # Seconds of healthy consuming that reset the backoff
     
     # Exchange settings
     otp_exchange: str = "user.otp.exchange"
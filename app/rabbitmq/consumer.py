@@ -1,6 +1,8 @@
 import json
 import logging
-from typing import Callable, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Set
 import pika
 from .config import rabbitmq_config
 from .setup import RabbitMQSetup
@@ -16,14 +18,14 @@ class RabbitMQConsumer:
         self.channel: Optional[pika.channel.Channel] = None
         self.setup = RabbitMQSetup()
     
-    def connect(self) -> None:
+    def connect(self, prefetch_count: int = 1) -> None:
         """Establish connection to RabbitMQ"""
         try:
             self.connection = self.setup.create_connection()
             self.channel = self.connection.channel()
             
-            # Set QoS to process one message at a time
-            self.channel.basic_qos(prefetch_count=1)
+            # Limit unacknowledged deliveries in flight on this channel (1 = one message at a time)
+            self.channel.basic_qos(prefetch_count=prefetch_count, global_qos=False)
             
             logger.info("RabbitMQ consumer connected successfully")
         except Exception as e:
@@ -97,41 +99,138 @@ class RabbitMQConsumer:
         logger.info("Stopped consuming messages")
 
 
-def create_otp_message_callback(handler_func: Callable) -> Callable:
+def _settle_message(ch, delivery_tag: int, success: bool) -> None:
+    """Ack a processed message, or reject it without requeueing to prevent infinite loops"""
+    if not ch.is_open:
+        # Channel went away, the broker redelivers the message
+        return
+    if success:
+        ch.basic_ack(delivery_tag=delivery_tag)
+        logger.info("OTP message processed successfully")
+    else:
+        ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+        logger.error("OTP message processing failed, message discarded")
+
+
+class AckBatcher:
+    """
+    Batches a channel's acks into single basic_ack(multiple=True) frames
+
+    Messages can finish out of order when handled on a pool, and a multiple
+    ack covers every delivery up to its tag, so acks are only sent up to the
+    highest tag below which every delivery has been settled. Rejections are
+    still sent one by one, straight away. All methods must run on the
+    channel's connection thread.
+    """
+
+    def __init__(self, channel, batch_size: int, flush_interval: float):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._settled_upto = 0  # Every delivery tag <= this is settled locally
+        self._settled_above: Set[int] = set()  # Settled tags past the contiguous prefix
+        self._acked_tags: Set[int] = set()  # Successful tags among _settled_above
+        self._last_success = 0  # Highest successful tag in the contiguous prefix
+        self._acked_upto = 0  # Highest tag acked on the broker
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._timer_pending = False
+
+    def settle(self, delivery_tag: int, success: bool) -> None:
+        """Record a processed message, rejecting failures immediately and acking in batches"""
+        if not self.channel.is_open:
+            # Channel went away, the broker redelivers the message
+            return
+        if success:
+            self._acked_tags.add(delivery_tag)
+            self._unflushed += 1
+            logger.info("OTP message processed successfully")
+        else:
+            self.channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+            logger.error("OTP message processing failed, message discarded")
+        self._settled_above.add(delivery_tag)
+
+        # Advance the contiguous prefix of settled deliveries
+        while self._settled_upto + 1 in self._settled_above:
+            self._settled_upto += 1
+            self._settled_above.discard(self._settled_upto)
+            if self._settled_upto in self._acked_tags:
+                self._acked_tags.discard(self._settled_upto)
+                self._last_success = self._settled_upto
+
+        if self._unflushed >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._unflushed and not self._timer_pending:
+            self._timer_pending = True
+            self.channel.connection.call_later(self.flush_interval, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer_pending = False
+        self.flush()
+
+    def flush(self) -> None:
+        """Ack every successful delivery in the settled prefix with one frame"""
+        self._last_flush = time.monotonic()
+        if self._last_success > self._acked_upto and self.channel.is_open:
+            self.channel.basic_ack(delivery_tag=self._last_success, multiple=True)
+            self._acked_upto = self._last_success
+        # Acks past a gap wait for the gap to close
+        self._unflushed = len(self._acked_tags)
+
+
+def create_otp_message_callback(
+    handler_func: Callable,
+    executor: Optional[ThreadPoolExecutor] = None,
+    ack_batcher: Optional[AckBatcher] = None
+) -> Callable:
     """
     Create a callback function for processing OTP messages
     
     Args:
         handler_func: Function to handle the OTP message processing
+        executor: Optional pool to run the handler on, so the connection's I/O thread
+            keeps receiving while prefetched messages are processed in parallel
+        ack_batcher: Optional batcher for the consuming channel, acks are sent one
+            by one without it
     
     Returns:
         Callback function for RabbitMQ consumer
     """
+    def settle(ch, delivery_tag: int, success: bool) -> None:
+        if ack_batcher is not None:
+            ack_batcher.settle(delivery_tag, success)
+        else:
+            _settle_message(ch, delivery_tag, success)
+
     def callback(ch, method, properties, body):
+        delivery_tag = method.delivery_tag
         try:
             # Parse message
             message_data = json.loads(body.decode('utf-8'))
             logger.info(f"Received OTP message: {message_data}")
 
-            # Process the message
-            success = handler_func(message_data)
+            if executor is None:
+                settle(ch, delivery_tag, handler_func(message_data))
+                return
+
+            def on_done(future: Future) -> None:
+                try:
+                    success = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing OTP message: {e}")
+                    success = False
+                # Channels are not thread-safe, the ack has to run on the connection's own thread
+                ch.connection.add_callback_threadsafe(lambda: settle(ch, delivery_tag, success))
 
-            if success:
-                # Acknowledge message
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info("OTP message processed successfully")
-            else:
-                # Reject message without requeueing to prevent infinite loops
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-                logger.error("OTP message processing failed, message discarded")
+            executor.submit(handler_func, message_data).add_done_callback(on_done)
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse message JSON: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            settle(ch, delivery_tag, False)
         except Exception as e:
             logger.error(f"Error processing OTP message: {e}")
             # Don't requeue on unexpected errors to prevent infinite loops
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            settle(ch, delivery_tag, False)
     
     return callback
 
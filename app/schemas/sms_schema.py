@@ -2,25 +2,13 @@ from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
 
-from app.utils.validators import PhoneValidator, validate_sms_text
+from app.utils.validators import PhoneStr, validate_sms_text
 
 
 class SMSRequest(BaseModel):
-    to: str = Field(..., min_length=10, max_length=20, description="Phone number in international format")
+    to: PhoneStr = Field(..., description="Phone number in international format")
     text: str = Field(..., min_length=1, max_length=1600, description="SMS text content")
-    from_number: Optional[str] = Field(None, min_length=10, max_length=20, description="Sender phone number")
-
-    @field_validator('to')
-    @classmethod
-    def validate_to_phone(cls, v):
-        return PhoneValidator.validate_phone_number(v, "recipient phone number")
-
-    @field_validator('from_number')
-    @classmethod
-    def validate_from_phone(cls, v):
-        if v is not None:
-            return PhoneValidator.validate_phone_number(v, "sender phone number")
-        return v
+    from_number: Optional[PhoneStr] = Field(None, description="Sender phone number")
 
     @field_validator('text')
     @classmethod
@@ -28,6 +16,7 @@ class SMSRequest(BaseModel):
         return validate_sms_text(v)
 
     model_config = {
+        "str_strip_whitespace": True,
         "json_schema_extra": {
             "example": {
                 "to": "09199078934",
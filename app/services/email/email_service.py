@@ -1,17 +1,24 @@
 import asyncio
+import binascii
+import itertools
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, Optional
-from datetime import datetime
-
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import os
+import re
+import secrets
+import ssl
+import time
+import weakref
+import email.policy
+from email.message import EmailMessage
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import aiosmtplib
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception
 
 from app.core.config import settings
-from app.schemas.email_schema import EmailRequest, EmailApiResponse, EmailResponse
+from app.schemas.email_schema import EmailRequest, EmailApiResponse
 from app.utils.csv_logger import email_logger
-from app.utils.validators import EmailValidator
 
 # Configure logging (fallback to standard logging if structlog not available)
 try:
@@ -21,6 +28,144 @@ except ImportError:
     logger = logging.getLogger(__name__)
 
 
+# Status recorded and returned for a delivered email
+STATUS_SENT = "sent"
+
+DEFAULT_SUBJECT = "Welcome to Our Service"
+
+DEFAULT_BODY = """Hello!
+
+Thank you for your interest in our service. This is an automated message to confirm that our communication system is working properly.
+
+If you have any questions or need assistance, please don't hesitate to contact us.
+
+Best regards,
+The Communication Service Team"""
+
+
+def _build_default_message_bytes() -> bytes:
+    """Serialize the default welcome email once, without its per-message To and Message-ID headers"""
+    msg = EmailMessage(policy=email.policy.SMTP)
+    msg['From'] = settings.gmail_username
+    msg['Subject'] = DEFAULT_SUBJECT
+    msg.set_content(DEFAULT_BODY)
+    return msg.as_bytes()
+
+
+_DEFAULT_MESSAGE_BYTES = _build_default_message_bytes()
+
+# Message-ID domain taken from the sender address, so ids never need the host FQDN resolved
+_MSGID_DOMAIN = settings.gmail_username.rpartition('@')[2] or "localhost"
+
+
+def _new_id_prefix() -> str:
+    """Per-process id prefix: start time, pid and a random tag"""
+    return f"{int(time.time())}.{os.getpid()}.{secrets.token_hex(4)}"
+
+
+_id_prefix = _new_id_prefix()
+_id_seq = itertools.count()
+
+
+def _reset_id_prefix() -> None:
+    """Give a forked child (e.g. a Celery prefork worker) its own id prefix"""
+    global _id_prefix, _id_seq
+    _id_prefix = _new_id_prefix()
+    _id_seq = itertools.count()
+
+
+os.register_at_fork(after_in_child=_reset_id_prefix)
+
+
+def _next_id() -> str:
+    """Process-unique id from a counter, no urandom read per message"""
+    return f"{_id_prefix}.{next(_id_seq)}"
+
+
+def _make_message_id() -> str:
+    """Message-ID header value for an outgoing email"""
+    return f"<{_next_id()}@{_MSGID_DOMAIN}>"
+
+
+# HTML detection (an <html> or doctype marker near the start) and tag stripping for the plain text alternative
+_HTML_SNIFF = re.compile(r'<(?:html|!doctype\s+html)', re.IGNORECASE).search
+_HTML_SNIFF_CHARS = 512
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+
+def _resolve_subject_body(email_request: EmailRequest) -> Tuple[str, str, bool]:
+    """
+    Use the custom subject/body if both are provided, otherwise the default welcome message
+
+    Returns:
+        Tuple of (subject, body, is_default)
+    """
+    if email_request.subject and email_request.body:
+        return email_request.subject, email_request.body, False
+    return DEFAULT_SUBJECT, DEFAULT_BODY, True
+
+
+def _is_plain_header(value: str) -> bool:
+    """Whether a header value can be written verbatim: ASCII, one line, no folding needed"""
+    return value.isascii() and '\r' not in value and '\n' not in value and len(value) <= 900
+
+
+def _qp_part(text: str, subtype: str) -> bytes:
+    """A quoted-printable utf-8 text part (headers and body) with CRLF line endings"""
+    data = text.replace('\r\n', '\n').replace('\r', '\n').encode('utf-8')
+    return (
+        b'Content-Type: text/' + subtype.encode('ascii') + b'; charset="utf-8"\r\n'
+        b'Content-Transfer-Encoding: quoted-printable\r\n\r\n'
+        + binascii.b2a_qp(data, istext=True).replace(b'\n', b'\r\n')
+    )
+
+
+def _build_message_bytes(
+    sender: str, to: str, subject: str, message_id: str, plain_body: str, html_body: Optional[str]
+) -> bytes:
+    """
+    Serialize a text email, with an optional HTML alternative, directly to SMTP wire bytes
+
+    `to` and `subject` must pass _is_plain_header. Boundaries start with "=_",
+    which can never occur in quoted-printable output.
+    """
+    headers = (
+        f"From: {sender}\r\nTo: {to}\r\nSubject: {subject}\r\n"
+        f"Message-ID: {message_id}\r\nMIME-Version: 1.0\r\n"
+    ).encode('utf-8')
+    if html_body is None:
+        return headers + _qp_part(plain_body, 'plain')
+
+    boundary = f"=_{_next_id()}".encode('ascii')
+    return (
+        headers
+        + b'Content-Type: multipart/alternative; boundary="' + boundary + b'"\r\n\r\n'
+        + b'--' + boundary + b'\r\n' + _qp_part(plain_body, 'plain') + b'\r\n'
+        + b'--' + boundary + b'\r\n' + _qp_part(html_body, 'html') + b'\r\n'
+        + b'--' + boundary + b'--\r\n'
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_tls_context() -> ssl.SSLContext:
+    """STARTTLS context shared by every SMTP session, so the CA bundle is loaded once per process"""
+    return ssl.create_default_context()
+
+
+def _is_transient_smtp_error(exc: BaseException) -> bool:
+    """Whether a send failure is worth retrying: lost connections, timeouts and 4xx replies"""
+    if isinstance(exc, (aiosmtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, aiosmtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(exc, aiosmtplib.SMTPRecipientsRefused):
+        return bool(exc.recipients) and all(400 <= error.code < 500 for error in exc.recipients)
+    if isinstance(exc, aiosmtplib.SMTPResponseException):
+        return 400 <= exc.code < 500
+    return False
+
+
 class EmailServiceError(Exception):
     """Custom exception for Email service errors"""
     pass
@@ -29,37 +174,150 @@ class EmailServiceError(Exception):
 class CircuitBreaker:
     """Simplified circuit breaker implementation for email service"""
 
+    __slots__ = ("threshold", "timeout", "failure_count", "last_failure_time")
+
     def __init__(self, threshold: int, timeout: int):
         self.threshold = threshold
         self.timeout = timeout
         self.failure_count = 0
-        self.last_failure_time = None
+        self.last_failure_time: float = 0.0  # time.monotonic() of the last failure
 
     def is_open(self) -> bool:
         """Check if circuit breaker is open"""
         if self.failure_count >= self.threshold:
-            if self.last_failure_time:
-                time_since_failure = (datetime.now() - self.last_failure_time).total_seconds()
-                if time_since_failure < self.timeout:
-                    return True
-                else:
-                    # Reset circuit breaker
-                    self.failure_count = 0
-                    self.last_failure_time = None
+            if time.monotonic() - self.last_failure_time < self.timeout:
+                return True
+            # Reset circuit breaker
+            self.failure_count = 0
+            self.last_failure_time = 0.0
         return False
 
     def record_failure(self):
         """Record a failure"""
         self.failure_count += 1
-        self.last_failure_time = datetime.now()
+        self.last_failure_time = time.monotonic()
 
     def record_success(self):
         """Record a success"""
         self.failure_count = 0
-        self.last_failure_time = None
+        self.last_failure_time = 0.0
+
+
+class EmailDispatcher:
+    """Queue of outgoing sends drained by SMTP worker coroutines on one event loop"""
+
+    __slots__ = ("queue", "_workers", "_closed")
+
+    def __init__(self, workers: int, maxsize: int):
+        # Bounded so bursts apply back-pressure to callers instead of piling up
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._closed = False
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open a session and do STARTTLS/AUTH once for all the sends that reuse it"""
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.smtp_server,
+            port=settings.smtp_port,
+            use_tls=False,
+            start_tls=True,
+            username=settings.gmail_username,
+            password=settings.gmail_app_password,
+            timeout=settings.email_smtp_timeout,
+            tls_context=_get_tls_context()
+        )
+        await smtp.connect()
+        return smtp
+
+    async def _probe(self, smtp: aiosmtplib.SMTP) -> Optional[aiosmtplib.SMTP]:
+        """NOOP an idle session, servers silently drop them; None means it must be reopened"""
+        try:
+            await smtp.noop()
+            return smtp
+        except (aiosmtplib.SMTPException, ConnectionError, TimeoutError):
+            smtp.close()
+            return None
+
+    async def _worker(self):
+        """Send queued jobs over this worker's own long-lived connection"""
+        smtp: Optional[aiosmtplib.SMTP] = None
+        last_used = 0.0
+        future: Optional[asyncio.Future] = None
+        try:
+            while True:
+                future = None
+                send, future = await self.queue.get()
+                if future.cancelled():
+                    continue
+                try:
+                    if smtp is not None and time.monotonic() - last_used > settings.email_smtp_idle_probe:
+                        smtp = await self._probe(smtp)
+                    if smtp is None or not smtp.is_connected:
+                        smtp = await self._connect()
+                    result = await send(smtp)
+                    last_used = time.monotonic()
+                except (aiosmtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                    # Drop the broken session, the next job reconnects
+                    if smtp is not None:
+                        smtp.close()
+                    smtp = None
+                    if not future.done():
+                        future.set_exception(e)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        except asyncio.CancelledError:
+            # Closed mid-send, the caller must not wait for a result that will never come
+            if future is not None and not future.done():
+                future.set_exception(EmailServiceError("dispatcher closed"))
+            raise
+        finally:
+            if smtp is not None and smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+    async def _submit(self, send):
+        """Queue a send call and wait for a worker to complete it"""
+        if self._closed:
+            raise EmailServiceError("dispatcher closed")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((send, future))
+        if self._closed and not future.done():
+            # Was blocked on a full queue while close() drained it
+            future.set_exception(EmailServiceError("dispatcher closed"))
+        return await future
+
+    async def send_message(self, msg: EmailMessage):
+        """Send a message object through the queue"""
+        return await self._submit(lambda smtp: smtp.send_message(msg))
+
+    async def sendmail(self, sender: str, recipients: List[str], message: bytes):
+        """Send pre-serialized message bytes through the queue"""
+        return await self._submit(lambda smtp: smtp.sendmail(sender, recipients, message))
+
+    async def close(self):
+        """Stop the workers and quit their sessions, failing every send that is still pending"""
+        self._closed = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(EmailServiceError("dispatcher closed"))
 
 
 class EmailService:
+    __slots__ = (
+        "smtp_server", "smtp_port", "gmail_username", "gmail_app_password",
+        "default_from", "circuit_breaker", "_dispatchers"
+    )
+
     def __init__(self):
         self.smtp_server = settings.smtp_server
         self.smtp_port = settings.smtp_port
@@ -67,69 +325,90 @@ class EmailService:
         self.gmail_app_password = settings.gmail_app_password
         self.default_from = settings.gmail_username
 
-        # Rate limiting and circuit breaker
-        self.rate_limit_semaphore = asyncio.Semaphore(settings.email_rate_limit)
+        # Circuit breaker
         self.circuit_breaker = CircuitBreaker(
             settings.email_circuit_breaker_threshold,
             settings.email_circuit_breaker_timeout
         )
 
+        # Send dispatchers, one per event loop that sends email
+        self._dispatchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmailDispatcher]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_dispatcher(self) -> EmailDispatcher:
+        """Get the dispatcher bound to the running event loop, starting it on first use"""
+        loop = asyncio.get_running_loop()
+        dispatcher = self._dispatchers.get(loop)
+        if dispatcher is None:
+            dispatcher = self._dispatchers[loop] = EmailDispatcher(
+                settings.email_smtp_pool_size,
+                settings.email_rate_limit * 4
+            )
+        return dispatcher
+
+    async def start(self):
+        """Start the SMTP workers on the running event loop"""
+        self._get_dispatcher()
+
+    async def close(self):
+        """Stop the SMTP workers started on the running event loop"""
+        dispatcher = self._dispatchers.pop(asyncio.get_running_loop(), None)
+        if dispatcher is not None:
+            await dispatcher.close()
+
     @retry(
         stop=stop_after_attempt(settings.email_retry_attempts),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((smtplib.SMTPException, ConnectionError, TimeoutError))
+        wait=wait_exponential_jitter(initial=1, max=10, jitter=2),
+        # Permanent failures (5xx, bad credentials) fail at once instead of retrying into the circuit breaker
+        retry=retry_if_exception(_is_transient_smtp_error)
     )
-    def _send_smtp_email_sync(self, email_request: EmailRequest) -> str:
-        """Send email via SMTP with retry logic"""
-        # Use custom subject/body if provided, otherwise use default welcome message
-        if email_request.subject and email_request.body:
-            subject = email_request.subject
-            body = email_request.body
+    async def _send_smtp_email(self, to: str, subject: str, body: str, is_default: bool = False) -> str:
+        """Send email via pooled SMTP connection with retry logic"""
+        # Default welcome message goes out as prebuilt bytes with only To and Message-ID added;
+        # a recipient that needs header encoding takes the EmailMessage path below instead
+        if is_default and _is_plain_header(to):
+            message_id = _make_message_id()
+            message = (
+                b"To: " + to.encode("utf-8") + b"\r\n"
+                + b"Message-ID: " + message_id.encode("ascii") + b"\r\n"
+                + _DEFAULT_MESSAGE_BYTES
+            )
+            await self._get_dispatcher().sendmail(self.default_from, [to], message)
+            return message_id
+
+        message_id = _make_message_id()
+
+        if _HTML_SNIFF(body[:_HTML_SNIFF_CHARS]):
+            # Plain text alternative (always include for compatibility) created by stripping HTML tags
+            plain_text_body = _TAG_RE.sub('', body)
+            plain_text_body = _WS_RE.sub(' ', plain_text_body).strip()
+            html_body = body
         else:
-            # Default welcome message
-            subject = "Welcome to Our Service"
-            body = """Hello!
-
-Thank you for your interest in our service. This is an automated message to confirm that our communication system is working properly.
+            plain_text_body = body
+            html_body = None
 
-If you have any questions or need assistance, please don't hesitate to contact us.
+        # Plain headers (e.g. OTP mails) are written straight to wire bytes, skipping the email package
+        if _is_plain_header(to) and _is_plain_header(subject):
+            message = _build_message_bytes(self.default_from, to, subject, message_id, plain_text_body, html_body)
+            await self._get_dispatcher().sendmail(self.default_from, [to], message)
+            return message_id
 
-Best regards,
-The Communication Service Team"""
-
-        # Create message
-        msg = MIMEMultipart('alternative')  # Use 'alternative' for plain text and HTML
+        # Create message (headers need RFC 2047 encoding or folding)
+        msg = EmailMessage()
         msg['From'] = self.default_from
-        msg['To'] = email_request.to
+        msg['To'] = to
         msg['Subject'] = subject
+        msg['Message-ID'] = message_id
+        msg.set_content(plain_text_body)
+        if html_body is not None:
+            msg.add_alternative(html_body, subtype='html')
 
-        # Check if body contains HTML tags
-        is_html = '<html' in body.lower() or '<!doctype html' in body.lower()
-
-        # Add plain text version (always include for compatibility)
-        if is_html:
-            # Create a plain text version by stripping HTML tags
-            import re
-            plain_text_body = re.sub(r'<[^>]+>', '', body)
-            plain_text_body = re.sub(r'\s+', ' ', plain_text_body).strip()
-            msg.attach(MIMEText(plain_text_body, 'plain'))
-
-        # Add HTML version if content is HTML, otherwise use plain text
-        if is_html:
-            msg.attach(MIMEText(body, 'html'))
-        else:
-            msg.attach(MIMEText(body, 'plain'))
+        await self._get_dispatcher().send_message(msg)
 
-        # Connect to server and send email
-        with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-            server.starttls()  # Enable security
-            server.login(self.gmail_username, self.gmail_app_password)
-            text = msg.as_string()
-            server.sendmail(msg['From'], msg['To'], text)
+        return message_id
 
-        return msg.get('Message-ID', 'unknown')
-
-    async def send_email(self, email_request: EmailRequest) -> EmailResponse:
+    async def send_email(self, email_request: EmailRequest) -> Dict[str, str]:
         """
         Send email using SMTP with async support and optimizations
         """
@@ -139,74 +418,66 @@ The Communication Service Team"""
             logger.error(f"Circuit breaker open: {error_msg}")
             raise EmailServiceError(error_msg)
 
-        # Apply rate limiting
-        async with self.rate_limit_semaphore:
-            try:
-                # Use custom subject/body if provided, otherwise use default welcome message
-                if email_request.subject and email_request.body:
-                    subject = email_request.subject
-                    body = email_request.body
-                else:
-                    # Default welcome message
-                    subject = "Welcome to Our Service"
-                    body = """Hello!
+        # Resolved before the try, the failure handler logs the subject
+        subject, body, is_default = _resolve_subject_body(email_request)
 
-Thank you for your interest in our service. This is an automated message to confirm that our communication system is working properly.
+        try:
+            logger.info(f"Sending email to {email_request.to} with subject {subject}")
 
-If you have any questions or need assistance, please don't hesitate to contact us.
+            message_id = await self._send_smtp_email(email_request.to, subject, body, is_default)
 
-Best regards,
-The Communication Service Team"""
+            # Plain dict in the EmailResponse shape, no model validation needed for server-built data
+            email_response = {"to": email_request.to, "status": STATUS_SENT}
 
-                logger.info(f"Sending email to {email_request.to} with subject {subject}")
+            # Log success
+            email_logger.log_email(
+                to=email_request.to,
+                from_email=self.default_from,
+                subject=subject,
+                message_id=message_id,
+                status=STATUS_SENT
+            )
 
-                # Run SMTP operation in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
-                message_id = await loop.run_in_executor(
-                    None, 
-                    self._send_smtp_email_sync,
-                    email_request
-                )
+            # Record success
+            self.circuit_breaker.record_success()
 
-                # Create response
-                email_response = EmailResponse(
-                    to=email_request.to,
-                    status="sent"
-                )
+            logger.info(f"Email sent successfully with message_id {message_id} to {email_request.to}")
 
-                # Log success
-                email_logger.log_email(
-                    to=email_request.to,
-                    from_email=self.default_from,
-                    subject=subject,
-                    message_id=message_id,
-                    status="sent"
-                )
+            return email_response
 
-                # Record success
-                self.circuit_breaker.record_success()
+        except Exception as e:
+            error_message = f"Email sending failed: {str(e)}"
+            logger.error(f"Email sending error: {str(e)}")
 
-                logger.info(f"Email sent successfully with message_id {message_id} to {email_request.to}")
+            # Handle failure
+            self.circuit_breaker.record_failure()
 
-                return email_response
+            # Log failure
+            email_logger.log_email(
+                to=email_request.to,
+                from_email=self.default_from,
+                subject=subject,
+                message_id=None,
+                status=error_message
+            )
 
-            except Exception as e:
-                error_message = f"Email sending failed: {str(e)}"
-                logger.error(f"Email sending error: {str(e)}")
+            raise EmailServiceError(error_message)
 
-                # Handle failure
-                self.circuit_breaker.record_failure()
+    async def send_bulk_emails(self, email_requests: List[EmailRequest]) -> List[Dict[str, str]]:
+        """
+        Send several emails concurrently
 
-                # Log failure
-                email_logger.log_email(
-                    to=email_request.to,
-                    from_email=self.default_from,
-                    subject=subject,
-                    message_id=None,
-                    status=error_message
-                )
+        Concurrency is bounded by the SMTP workers draining the send queue, so
+        all sends can be gathered at once. A failed send yields a failure
+        status for that recipient instead of aborting the batch.
+        """
+        async def _send_one(email_request: EmailRequest) -> Dict[str, str]:
+            try:
+                return await self.send_email(email_request)
+            except EmailServiceError as e:
+                return {"to": email_request.to, "status": f"Failed: {str(e)}"}
 
-                raise EmailServiceError(error_message)
+        return await asyncio.gather(*(_send_one(email_request) for email_request in email_requests))
 
     def get_email_logs(self, days: int = None):
         """
@@ -214,6 +485,35 @@ The Communication Service Team"""
         """
         return email_logger.get_logs(days)
 
+    def get_email_logs_iter(self, days: int = None):
+        """
+        Iterate email logs from CSV row by row
+        """
+        return email_logger.iter_logs(days)
+
+    def get_email_logs_cached(self, days: int = None):
+        """
+        Get email logs from CSV through the in-process cache
+
+        Returns:
+            Tuple of (logs, cache_hit)
+        """
+        return email_logger.get_logs_cached(days)
+
+
+# Global email service instance, created on first use
+_email_service: Optional[EmailService] = None
+
+
+def get_email_service() -> EmailService:
+    """Get or create the email service instance"""
+    global _email_service
+    if _email_service is None:
+        _email_service = EmailService()
+    return _email_service
+
 
-# Global email service instance
-email_service = EmailService()
+async def close_email_service() -> None:
+    """Stop the email service's SMTP workers on the running event loop, if it was ever created"""
+    if _email_service is not None:
+        await _email_service.close()
@@ -1,8 +1,11 @@
 import logging
+import random
 import threading
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 
-from app.rabbitmq.consumer import get_rabbitmq_consumer, create_otp_message_callback
+from app.rabbitmq.consumer import AckBatcher, RabbitMQConsumer, create_otp_message_callback
 from app.rabbitmq.config import rabbitmq_config
 from .otp_handler import otp_handler
 
@@ -13,38 +16,72 @@ class OTPConsumerService:
     """Service to consume OTP messages from RabbitMQ queues"""
     
     def __init__(self):
-        self.consumer = get_rabbitmq_consumer()
         self.otp_handler = otp_handler
-        self.consumer_thread: Optional[threading.Thread] = None
+        # One consumer per connection and thread, pika connections must not be shared across threads
+        self.consumers: List[RabbitMQConsumer] = []
+        self.consumer_threads: List[threading.Thread] = []
+        self.ack_batchers: List[AckBatcher] = []
+        # Handlers run here so consumer threads only receive and ack
+        self.executor: Optional[ThreadPoolExecutor] = None
         self.is_running = False
+        # Set on stop so a consumer waiting to reconnect wakes up immediately
+        self._stopped = threading.Event()
+        self._prefetch_count = 1
     
     def start_consuming(self) -> None:
         """Start consuming OTP messages from both email and SMS queues"""
         try:
             logger.info("Starting OTP consumer service...")
             
-            # Connect to RabbitMQ
-            self.consumer.connect()
+            queue_handlers = [
+                (rabbitmq_config.email_queue, self.otp_handler.handle_email_otp),
+                (rabbitmq_config.sms_queue, self.otp_handler.handle_sms_otp)
+            ]
             
-            # Setup email OTP consumer
-            email_callback = create_otp_message_callback(self.otp_handler.handle_email_otp)
-            self.consumer.setup_consumer(rabbitmq_config.email_queue, email_callback)
-            logger.info(f"Email OTP consumer setup for queue: {rabbitmq_config.email_queue}")
+            self.executor = ThreadPoolExecutor(
+                max_workers=rabbitmq_config.handler_workers,
+                thread_name_prefix="otp-handler"
+            )
+            # Enough prefetched deliveries to keep every handler thread busy without
+            # buffering more than the pool can work through
+            self._prefetch_count = rabbitmq_config.prefetch_count or rabbitmq_config.handler_workers * 2
+            self._stopped.clear()
             
-            # Setup SMS OTP consumer
-            sms_callback = create_otp_message_callback(self.otp_handler.handle_sms_otp)
-            self.consumer.setup_consumer(rabbitmq_config.sms_queue, sms_callback)
-            logger.info(f"SMS OTP consumer setup for queue: {rabbitmq_config.sms_queue}")
+            for queue_name, handler in queue_handlers:
+                for index in range(rabbitmq_config.consumers_per_queue):
+                    consumer = RabbitMQConsumer()
+                    self.consumers.append(consumer)
+                    self.ack_batchers.append(None)
+                    slot = len(self.consumers) - 1
+                    self._connect_consumer(slot, queue_name, handler)
+                    self.consumer_threads.append(threading.Thread(
+                        target=self._consume_messages,
+                        args=(slot, queue_name, handler),
+                        name=f"otp-consumer-{queue_name}-{index}",
+                        daemon=True
+                    ))
+                logger.info(
+                    f"OTP consumer setup for queue: {queue_name} "
+                    f"({rabbitmq_config.consumers_per_queue} consumer(s))"
+                )
             
-            # Start consuming in a separate thread
+            # Each consumer runs on its own thread
             self.is_running = True
-            self.consumer_thread = threading.Thread(target=self._consume_messages, daemon=True)
-            self.consumer_thread.start()
+            for thread in self.consumer_threads:
+                thread.start()
             
             logger.info("OTP consumer service started successfully")
             
         except Exception as e:
             logger.error(f"Failed to start OTP consumer service: {e}")
+            for consumer in self.consumers:
+                consumer.disconnect()
+            self.consumers.clear()
+            self.consumer_threads.clear()
+            self.ack_batchers.clear()
+            if self.executor:
+                self.executor.shutdown(wait=False)
+                self.executor = None
             raise
     
     def stop_consuming(self) -> None:
@@ -52,31 +89,98 @@ class OTPConsumerService:
         try:
             logger.info("Stopping OTP consumer service...")
             self.is_running = False
+            self._stopped.set()
             
-            if self.consumer:
-                self.consumer.stop_consuming()
-                self.consumer.disconnect()
+            # stop_consuming has to run on each connection's own thread
+            for consumer in self.consumers:
+                if consumer.connection and consumer.connection.is_open:
+                    consumer.connection.add_callback_threadsafe(consumer.stop_consuming)
             
-            if self.consumer_thread and self.consumer_thread.is_alive():
-                self.consumer_thread.join(timeout=5)
+            for thread in self.consumer_threads:
+                if thread.is_alive():
+                    thread.join(timeout=5)
+            
+            # Let in-flight handlers finish, then deliver the acks they queued
+            if self.executor:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            for consumer, ack_batcher, thread in zip(self.consumers, self.ack_batchers, self.consumer_threads):
+                if thread.is_alive():
+                    # pika connections are not thread-safe, leave this one to its (daemon) thread
+                    logger.warning(f"OTP consumer thread {thread.name} did not stop in time, skipping its shutdown")
+                    continue
+                if ack_batcher and consumer.connection and consumer.connection.is_open:
+                    consumer.connection.process_data_events(time_limit=0)
+                    ack_batcher.flush()
+                consumer.disconnect()
+            self.consumers.clear()
+            self.consumer_threads.clear()
+            self.ack_batchers.clear()
+
+            self.otp_handler.close()
             
             logger.info("OTP consumer service stopped")
             
         except Exception as e:
             logger.error(f"Error stopping OTP consumer service: {e}")
     
-    def _consume_messages(self) -> None:
-        """Internal method to consume messages (runs in separate thread)"""
-        try:
+    def _connect_consumer(self, slot: int, queue_name: str, handler: Callable) -> None:
+        """(Re)open a consumer's connection and subscribe it, with a fresh ack batcher for the new channel"""
+        consumer = self.consumers[slot]
+        consumer.connect(prefetch_count=self._prefetch_count)
+        ack_batcher = AckBatcher(
+            consumer.channel,
+            rabbitmq_config.ack_batch_size,
+            rabbitmq_config.ack_flush_interval
+        )
+        self.ack_batchers[slot] = ack_batcher
+        consumer.setup_consumer(queue_name, create_otp_message_callback(handler, self.executor, ack_batcher))
+
+    def _consume_messages(self, slot: int, queue_name: str, handler: Callable) -> None:
+        """
+        Internal method to consume messages (runs in a consumer's own thread)
+
+        A clean return from start_consuming means the service is stopping. On a
+        connection or channel error the consumer reconnects after an exponential
+        backoff with jitter, so a failing broker is not hammered with reconnects.
+        """
+        consumer = self.consumers[slot]
+        backoff = rabbitmq_config.reconnect_initial_backoff
+        while self.is_running:
+            started = time.monotonic()
+            try:
+                consumer.start_consuming()
+                break
+            except Exception as e:
+                logger.error(f"Error in consumer thread for {queue_name}: {e}")
+
+            if time.monotonic() - started > rabbitmq_config.reconnect_reset_after:
+                backoff = rabbitmq_config.reconnect_initial_backoff
+
+            # Keep retrying until the broker is back or the service is stopped
             while self.is_running:
-                self.consumer.start_consuming()
-        except Exception as e:
-            logger.error(f"Error in consumer thread: {e}")
-            self.is_running = False
+                delay = backoff + random.uniform(0, 1)
+                backoff = min(backoff * 2, rabbitmq_config.reconnect_max_backoff)
+                if self._stopped.wait(delay):
+                    return
+                try:
+                    consumer.disconnect()
+                except Exception:
+                    pass  # The old connection is already broken
+                try:
+                    self._connect_consumer(slot, queue_name, handler)
+                    logger.info(f"OTP consumer reconnected to queue: {queue_name}")
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to reconnect OTP consumer for {queue_name}: {e}")
     
     def is_healthy(self) -> bool:
         """Check if the consumer service is healthy"""
-        return self.is_running and self.consumer_thread and self.consumer_thread.is_alive()
+        return (
+            self.is_running
+            and bool(self.consumer_threads)
+            and all(thread.is_alive() for thread in self.consumer_threads)
+        )
 
 
 # Global OTP consumer service instance
@@ -1,12 +1,17 @@
 import logging
 import asyncio
-from typing import Dict, Any
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-from app.services.email.email_service import email_service
+from app.core.config import settings
+from app.services.email.email_service import STATUS_SENT, EmailService, get_email_service, close_email_service
 from app.services.sms.sms_service import sms_service
 from app.schemas.email_schema import EmailRequest
 from app.schemas.sms_schema import SMSRequest
+from app.services.otp.templates import OTP_EMAIL_TEMPLATE
+from app.utils.event_loop import new_event_loop
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +20,58 @@ class OTPHandler:
     """Handles OTP message processing for both email and SMS"""
     
     def __init__(self):
-        self.email_service = email_service
         self.sms_service = sms_service
+
+        # Persistent event loop for OTP email and SMS sends, so SMTP sessions survive between messages
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def email_service(self) -> EmailService:
+        """Email service, created on first use"""
+        return get_email_service()
     
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the OTP send loop, starting its thread on first use"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="otp-send-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def _run_in_loop(self, coro):
+        """Run a coroutine on the OTP send loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+        try:
+            return future.result(timeout=settings.otp_send_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def close(self) -> None:
+        """Close the SMTP sessions and SMS HTTP client held by the OTP send loop and stop it"""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is None or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(close_email_service(), loop).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Error closing OTP email connections: {e}")
+        try:
+            asyncio.run_coroutine_threadsafe(self.sms_service.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Error closing OTP SMS client: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not thread.is_alive():
+            loop.close()
+
     def handle_email_otp(self, message_data: Dict[str, Any]) -> bool:
         """
         Handle email OTP message from RabbitMQ
@@ -45,111 +99,15 @@ class OTPHandler:
             # Create email request with OTP content
             subject = f"Verification Code: {otp_code}"
 
-            # Create modern, concise HTML email template
-            body = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #374151;
-            max-width: 480px;
-            margin: 0 auto;
-            background: #f9fafb;
-            padding: 20px;
-        }}
-        .card {{
-            background: white;
-            border-radius: 16px;
-            padding: 32px;
-            box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1);
-            text-align: center;
-        }}
-        .logo {{
-            font-size: 28px;
-            margin-bottom: 16px;
-        }}
-        .title {{
-            font-size: 20px;
-            font-weight: 600;
-            color: #111827;
-            margin-bottom: 8px;
-        }}
-        .subtitle {{
-            color: #6b7280;
-            margin-bottom: 24px;
-        }}
-        .otp-code {{
-            background: linear-gradient(135deg, #3b82f6, #1d4ed8);
-            color: white;
-            font-size: 36px;
-            font-weight: 700;
-            font-family: 'Monaco', 'Menlo', monospace;
-            letter-spacing: 8px;
-            padding: 20px 16px;
-            border-radius: 12px;
-            margin: 24px 0;
-            display: inline-block;
-            box-shadow: 0 4px 14px 0 rgba(59, 130, 246, 0.3);
-        }}
-        .timer {{
-            background: #fef3c7;
-            color: #92400e;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 14px;
-            font-weight: 500;
-            display: inline-block;
-            margin-bottom: 16px;
-        }}
-        .warning {{
-            background: #fef2f2;
-            color: #991b1b;
-            padding: 16px;
-            border-radius: 8px;
-            font-size: 14px;
-            margin: 20px 0;
-        }}
-        .footer {{
-            margin-top: 32px;
-            padding-top: 24px;
-            border-top: 1px solid #e5e7eb;
-            color: #9ca3af;
-            font-size: 13px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="card">
-        <div class="logo">🔐</div>
-        <h1 class="title">Verify Your Account</h1>
-        <p class="subtitle">Enter this code to complete your verification</p>
-
-        <div class="timer">⏰ Expires in 5 minutes</div>
-
-        <div class="otp-code">{otp_code}</div>
-
-        <div class="warning">
-            <strong>Don't share this code</strong> with anyone. Our team will never ask for it.
-        </div>
-
-        <div class="footer">
-            <p>If you didn't request this code, please ignore this email.</p>
-            <p>© 2025 Your Company</p>
-        </div>
-    </div>
-</body>
-</html>"""
+            # Render the prebuilt HTML email template
+            body = OTP_EMAIL_TEMPLATE.format(otp_code=otp_code)
 
             email_request = EmailRequest(to=identifier, subject=subject, body=body)
 
-            # Send email with OTP using asyncio.run for sync context
-            response = asyncio.run(self._send_otp_email(email_request))
-            
-            if response:
+            # Send email with OTP on the persistent send loop (reuses its SMTP sessions)
+            response = self._run_in_loop(self.email_service.send_email(email_request))
+
+            if response and response["status"] == STATUS_SENT:
                 logger.info(f"Email OTP sent successfully to {identifier}")
                 return True
             else:
@@ -177,9 +135,9 @@ class OTPHandler:
             sms_text = f"کد OTP شما: {otp_code}"
             sms_request = SMSRequest(to=identifier, text=sms_text)
 
-            # Send SMS with OTP using asyncio.run for sync context
+            # Send SMS with OTP on the persistent send loop instead of a fresh loop per message
             try:
-                response = asyncio.run(self.sms_service.send_sms(sms_request))
+                response = self._run_in_loop(self.sms_service.send_sms(sms_request))
 
                 # Check if SMS was sent successfully
                 # "ارسال موفق بود" = successfully sent, "successful" = English success, "200" = HTTP success
@@ -198,30 +156,6 @@ class OTPHandler:
         except Exception as e:
             logger.error(f"Error processing SMS OTP message: {e}")
             return False
-    
-    async def _send_otp_email(self, email_request: EmailRequest) -> bool:
-        """
-        Send OTP email with custom content
-
-        Args:
-            email_request: Email request object with OTP content
-
-        Returns:
-            bool: True if sent successfully, False otherwise
-        """
-        try:
-            response = await self.email_service.send_email(email_request)
-
-            if response and response.status == "sent":
-                logger.info(f"OTP email sent to {email_request.to}")
-                return True
-            else:
-                logger.error(f"Failed to send OTP email to {email_request.to}")
-                return False
-
-        except Exception as e:
-            logger.error(f"Error sending OTP email: {e}")
-            return False
 
 
 # Global OTP handler instance
@@ -0,0 +1,117 @@
+"""Email templates for OTP messages"""
+
+import re
+
+_WS_RE = re.compile(r'\s+')
+_STYLE_RE = re.compile(r'(<style>)(.*?)(</style>)', re.DOTALL)
+_CSS_PUNCT_RE = re.compile(r'\s*([{};:,])\s*')
+
+
+def _minify_html(html: str) -> str:
+    """Collapse whitespace runs and drop whitespace around CSS punctuation"""
+    # A space is kept between tags, the plain text alternative strips tags to nothing
+    html = _WS_RE.sub(' ', html).strip()
+    return _STYLE_RE.sub(lambda m: m.group(1) + _CSS_PUNCT_RE.sub(r'\1', m.group(2)).strip() + m.group(3), html)
+
+
+# Modern, concise HTML email for OTP codes; format with otp_code (CSS braces are escaped)
+_OTP_EMAIL_TEMPLATE_SOURCE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <style>
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            line-height: 1.6;
+            color: #374151;
+            max-width: 480px;
+            margin: 0 auto;
+            background: #f9fafb;
+            padding: 20px;
+        }}
+        .card {{
+            background: white;
+            border-radius: 16px;
+            padding: 32px;
+            box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1);
+            text-align: center;
+        }}
+        .logo {{
+            font-size: 28px;
+            margin-bottom: 16px;
+        }}
+        .title {{
+            font-size: 20px;
+            font-weight: 600;
+            color: #111827;
+            margin-bottom: 8px;
+        }}
+        .subtitle {{
+            color: #6b7280;
+            margin-bottom: 24px;
+        }}
+        .otp-code {{
+            background: linear-gradient(135deg, #3b82f6, #1d4ed8);
+            color: white;
+            font-size: 36px;
+            font-weight: 700;
+            font-family: 'Monaco', 'Menlo', monospace;
+            letter-spacing: 8px;
+            padding: 20px 16px;
+            border-radius: 12px;
+            margin: 24px 0;
+            display: inline-block;
+            box-shadow: 0 4px 14px 0 rgba(59, 130, 246, 0.3);
+        }}
+        .timer {{
+            background: #fef3c7;
+            color: #92400e;
+            padding: 8px 16px;
+            border-radius: 20px;
+            font-size: 14px;
+            font-weight: 500;
+            display: inline-block;
+            margin-bottom: 16px;
+        }}
+        .warning {{
+            background: #fef2f2;
+            color: #991b1b;
+            padding: 16px;
+            border-radius: 8px;
+            font-size: 14px;
+            margin: 20px 0;
+        }}
+        .footer {{
+            margin-top: 32px;
+            padding-top: 24px;
+            border-top: 1px solid #e5e7eb;
+            color: #9ca3af;
+            font-size: 13px;
+        }}
+    </style>
+</head>
+<body>
+    <div class="card">
+        <div class="logo">🔐</div>
+        <h1 class="title">Verify Your Account</h1>
+        <p class="subtitle">Enter this code to complete your verification</p>
+
+        <div class="timer">⏰ Expires in 5 minutes</div>
+
+        <div class="otp-code">{otp_code}</div>
+
+        <div class="warning">
+            <strong>Don't share this code</strong> with anyone. Our team will never ask for it.
+        </div>
+
+        <div class="footer">
+            <p>If you didn't request this code, please ignore this email.</p>
+            <p>© 2025 Your Company</p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+# Minified once at import, so every OTP email carries fewer bytes
+OTP_EMAIL_TEMPLATE: str = _minify_html(_OTP_EMAIL_TEMPLATE_SOURCE)
@@ -1,10 +1,13 @@
 import asyncio
 import logging
-from typing import Dict, Optional
-from datetime import datetime
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import orjson
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception_type
 
 from app.core.config import settings
 from app.schemas.sms_schema import SMSRequest, SMSApiResponse, SMSResponse
@@ -25,36 +28,109 @@ class SMSServiceError(Exception):
 
 
 class CircuitBreaker:
-    """Simplified circuit breaker implementation"""
+    """
+    Circuit breaker with a half-open state
 
-    def __init__(self, threshold: int, timeout: int):
+    After the open timeout one probe call at a time is let through; enough
+    probe successes close the breaker, a probe failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, timeout: int, success_threshold: int = 1):
         self.threshold = threshold
         self.timeout = timeout
+        self.success_threshold = success_threshold
+        self.state = self.CLOSED
         self.failure_count = 0
-        self.last_failure_time = None
+        self.success_count = 0
+        self.last_failure_time = 0.0  # time.monotonic() of the last failure
+        self.probe_started = 0.0  # time.monotonic() the in-flight half-open probe was admitted, 0 if none
+        self._lock = threading.Lock()
 
     def is_open(self) -> bool:
-        """Check if circuit breaker is open"""
-        if self.failure_count >= self.threshold:
-            if self.last_failure_time:
-                time_since_failure = (datetime.now() - self.last_failure_time).total_seconds()
-                if time_since_failure < self.timeout:
+        """Check if circuit breaker is open; in half-open state this admits the caller as the probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.last_failure_time < self.timeout:
                     return True
-                else:
-                    # Reset circuit breaker
-                    self.failure_count = 0
-                    self.last_failure_time = None
-        return False
+                self.state = self.HALF_OPEN
+                self.success_count = 0
+                self.probe_started = 0.0
+
+            # Half-open: one probe at a time (a probe that never reported back stops blocking after the timeout)
+            if self.probe_started and now - self.probe_started < self.timeout:
+                return True
+            self.probe_started = now
+            return False
 
     def record_failure(self):
         """Record a failure"""
-        self.failure_count += 1
-        self.last_failure_time = datetime.now()
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = time.monotonic()
+            if self.state == self.HALF_OPEN or self.failure_count >= self.threshold:
+                self.state = self.OPEN
+                self.probe_started = 0.0
 
     def record_success(self):
         """Record a success"""
-        self.failure_count = 0
-        self.last_failure_time = None
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.success_count += 1
+                self.probe_started = 0.0
+                if self.success_count < self.success_threshold:
+                    return
+            self.state = self.CLOSED
+            self.failure_count = 0
+            self.last_failure_time = 0.0
+
+
+class TokenBucket:
+    """
+    Token bucket capping request rate, shared by every event loop and thread
+
+    Each acquire reserves a token under a lock and then sleeps until that token
+    is due, so waiters are released at the configured rate instead of all at once.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly ahead of time, and return how long to wait until it is available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def _refund(self) -> None:
+        """Give back a reserved token whose request was abandoned"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        delay = self._reserve()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # A cancelled waiter (e.g. an OTP send timeout) must not hold back later sends
+                self._refund()
+                raise
 
 
 class SMSService:
@@ -67,34 +143,60 @@ class SMSService:
         self.timeout = httpx.Timeout(settings.sms_timeout, connect=settings.http_connect_timeout)
         self.limits = httpx.Limits(
             max_keepalive_connections=settings.http_max_keepalive_connections,
-            max_connections=settings.http_max_connections
+            max_connections=settings.http_max_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self.api_key}" if self.api_key else ""
+        }
+
+        # One pooled client per event loop (API, Celery worker and OTP loops each get their own),
+        # so keep-alive connections and TLS sessions are reused across requests
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
         )
 
-        # Rate limiting and circuit breaker
-        self.rate_limit_semaphore = asyncio.Semaphore(settings.sms_rate_limit)
+        # Rate limiting (requests per second; in-flight requests are capped by the client's connection pool)
+        # and circuit breaker
+        self.rate_limiter = TokenBucket(settings.sms_rate_limit, settings.sms_rate_limit)
         self.circuit_breaker = CircuitBreaker(
             settings.sms_circuit_breaker_threshold,
-            settings.sms_circuit_breaker_timeout
+            settings.sms_circuit_breaker_timeout,
+            settings.sms_circuit_breaker_success_threshold
         )
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the HTTP client bound to the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                headers=self.headers
+            )
+        return client
+
+    async def start(self):
+        """Create the HTTP client for the running event loop"""
+        self._get_client()
+
+    async def close(self):
+        """Close the HTTP client created on the running event loop"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
     @retry(
         stop=stop_after_attempt(settings.sms_retry_attempts),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
+        wait=wait_exponential_jitter(initial=1, max=10, jitter=2),
         retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError, httpx.RemoteProtocolError))
     )
     async def _send_http_request(self, payload: Dict) -> httpx.Response:
-        """Send HTTP request with retry logic"""
-        async with httpx.AsyncClient(timeout=self.timeout, limits=self.limits) as client:
-            response = await client.post(
-                self.api_url,
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}" if self.api_key else ""
-                }
-            )
-            return response
+        """Send HTTP request over the pooled client with retry logic"""
+        return await self._get_client().post(self.api_url, content=orjson.dumps(payload))
 
     async def send_sms(self, sms_request: SMSRequest) -> SMSResponse:
         """
@@ -117,59 +219,78 @@ class SMSService:
         }
 
         # Apply rate limiting
-        async with self.rate_limit_semaphore:
-            try:
-                logger.info(f"Sending SMS to {converted_phone} (original: {sms_request.to}) from {payload['from']}")
-
-                response = await self._send_http_request(payload)
+        await self.rate_limiter.acquire()
 
-                if response.status_code == 200:
-                    api_response = response.json()
-                    sms_api_response = SMSApiResponse(**api_response)
+        try:
+            logger.info(f"Sending SMS to {converted_phone} (original: {sms_request.to}) from {payload['from']}")
 
-                    # Create response
-                    sms_response = SMSResponse(
-                        to=sms_request.to,
-                        status=sms_api_response.status
-                    )
+            response = await self._send_http_request(payload)
 
-                    # Log success
-                    sms_logger.log_sms(
-                        to=sms_request.to,
-                        from_number=payload["from"],
-                        text=sms_request.text,
-                        rec_id=sms_api_response.recId,
-                        status=sms_api_response.status
-                    )
-
-                    # Record success
-                    self.circuit_breaker.record_success()
+            if response.status_code == 200:
+                if settings.trust_sms_api_response:
+                    sms_api_response = SMSApiResponse.model_construct(**orjson.loads(response.content))
+                else:
+                    sms_api_response = SMSApiResponse.model_validate_json(response.content)
+
+                # Create response
+                sms_response = SMSResponse(
+                    to=sms_request.to,
+                    status=sms_api_response.status
+                )
+
+                # Log success
+                sms_logger.log_sms(
+                    to=sms_request.to,
+                    from_number=payload["from"],
+                    text=sms_request.text,
+                    rec_id=sms_api_response.recId,
+                    status=sms_api_response.status
+                )
+
+                # Record success
+                self.circuit_breaker.record_success()
+
+                logger.info(f"SMS sent successfully with rec_id {sms_api_response.recId} and status {sms_api_response.status}")
+
+                return sms_response
+
+            else:
+                error_message = f"API request failed: {response.status_code} - {response.text}"
+                logger.error(f"SMS API error with status_code {response.status_code}")
+
+        except Exception as e:
+            error_message = f"SMS sending failed: {str(e)}"
+            logger.error(f"SMS sending error: {str(e)}")
+
+        # Handle failure
+        self.circuit_breaker.record_failure()
+
+        # Log failure
+        sms_logger.log_sms(
+            to=sms_request.to,
+            from_number=payload["from"],
+            text=sms_request.text,
+            rec_id=None,
+            status=error_message
+        )
 
-                    logger.info(f"SMS sent successfully with rec_id {sms_api_response.recId} and status {sms_api_response.status}")
+        raise SMSServiceError(error_message)
 
-                    return sms_response
+    async def send_bulk_sms(self, sms_requests: List[SMSRequest]) -> List[SMSResponse]:
+        """
+        Send several SMS concurrently
 
-                else:
-                    error_message = f"API request failed: {response.status_code} - {response.text}"
-                    logger.error(f"SMS API error with status_code {response.status_code}")
-
-            except Exception as e:
-                error_message = f"SMS sending failed: {str(e)}"
-                logger.error(f"SMS sending error: {str(e)}")
-
-            # Handle failure
-            self.circuit_breaker.record_failure()
-
-            # Log failure
-            sms_logger.log_sms(
-                to=sms_request.to,
-                from_number=payload["from"],
-                text=sms_request.text,
-                rec_id=None,
-                status=error_message
-            )
+        The token bucket paces the sends and the client's connection pool caps
+        requests in flight, so all sends can be gathered at once. A failed send
+        yields a failure status for that recipient instead of aborting the batch.
+        """
+        async def _send_one(sms_request: SMSRequest) -> SMSResponse:
+            try:
+                return await self.send_sms(sms_request)
+            except SMSServiceError as e:
+                return SMSResponse(to=sms_request.to, status=f"Failed: {str(e)}")
 
-            raise SMSServiceError(error_message)
+        return await asyncio.gather(*(_send_one(sms_request) for sms_request in sms_requests))
 
     def get_sms_logs(self, days: int = None):
         """
@@ -177,6 +298,21 @@ class SMSService:
         """
         return sms_logger.get_logs(days)
 
+    def get_sms_logs_iter(self, days: int = None):
+        """
+        Iterate SMS logs from CSV row by row
+        """
+        return sms_logger.iter_logs(days)
+
+    def get_sms_logs_cached(self, days: int = None):
+        """
+        Get SMS logs from CSV through the in-process cache
+
+        Returns:
+            Tuple of (logs, cache_hit)
+        """
+        return sms_logger.get_logs_cached(days)
+
 
 # Global SMS service instance
 sms_service = SMSService()
\ No newline at end of file
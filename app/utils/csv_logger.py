@@ -1,10 +1,75 @@
+import io
 import os
 import csv
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import atexit
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 
 from app.core.config import settings
 
+# Vectorized log reads when pyarrow is installed (optional, falls back to the csv module)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pacsv = None
+
+
+def _iter_raw_records(file) -> Iterator[str]:
+    """Yield raw CSV records, joining the physical lines of quoted fields that contain newlines"""
+    pending: List[str] = []
+    quotes = 0
+    for line in file:
+        quotes += line.count('"')
+        if quotes % 2:
+            # Inside a quoted field, the record continues on the next line
+            pending.append(line)
+            continue
+        if pending:
+            pending.append(line)
+            line = ''.join(pending)
+            pending = []
+        quotes = 0
+        yield line
+    if pending:
+        yield ''.join(pending)
+
+
+def _record_timestamp(record: str) -> str:
+    """A raw record's leading timestamp column, using the CSV parser only if that field is quoted"""
+    timestamp = record.split(',', 1)[0]
+    if not timestamp.startswith('"'):
+        return timestamp
+    try:
+        row = next(csv.reader([record]), None)
+    except csv.Error:
+        return ''
+    return row[0] if row else ''
+
+
+def _is_expired(timestamp: str, cutoff: str) -> bool:
+    """Whether an isoformat timestamp is older than the isoformat cutoff; unparseable timestamps are kept"""
+    if len(timestamp) >= 19 and timestamp[10] == 'T' and timestamp.isascii():
+        # isoformat() output is zero-padded, so it sorts as a string exactly like the datetime
+        return timestamp < cutoff
+    try:
+        return datetime.fromisoformat(timestamp) < datetime.fromisoformat(cutoff)
+    except (ValueError, TypeError):
+        return False
+
+
+def _write_all(fd: int, data: bytes):
+    """os.write until every byte is written (a single call unless the write is interrupted)"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
 
 class SimpleCSVLogger:
     """Simplified CSV logger without complex async/threading overhead"""
@@ -16,6 +81,7 @@ class SimpleCSVLogger:
 
         os.makedirs(self.logs_dir, exist_ok=True)
 
+        # Rows go to one file per day (sms_logs-YYYY-MM-DD.csv), log_file is the pre-rotation single file
         if log_type == "sms":
             self.log_file = os.path.join(self.logs_dir, settings.sms_log_file)
             self.columns = ["timestamp", "to", "from_number", "text", "recId", "status", "sent_at"]
@@ -25,113 +91,404 @@ class SimpleCSVLogger:
         else:
             raise ValueError(f"Invalid log type: {log_type}")
 
-        self._ensure_log_file_exists()
-
-    def _ensure_log_file_exists(self):
-        """Ensure the log file exists with headers"""
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(self.columns)
+        self._file_stem, self._file_ext = os.path.splitext(os.path.basename(self.log_file))
+
+        # Parsed get_logs results keyed by `days`: (file signature, cached_at, logs)
+        self._logs_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Rows waiting to be appended in one write by the background flusher
+        self._buffer: List[tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._flusher_pid: Optional[int] = None
+
+        # O_APPEND descriptor of the current day's file kept open between flushes (guarded by _write_lock)
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+        self._fd_path: Optional[str] = None
+
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """
+        Drop the parent's buffered rows in a forked child (e.g. a Celery prefork worker)
+
+        The parent still flushes them itself, so keeping them would log every row twice. Locks are
+        replaced too, another parent thread may have held one at the moment of the fork.
+        """
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._cache_lock = threading.Lock()
+        self._logs_cache = OrderedDict()
+
+    def _day_file(self, day: str) -> str:
+        """Path of the log file holding rows whose timestamp starts with the YYYY-MM-DD `day`"""
+        return os.path.join(self.logs_dir, f"{self._file_stem}-{day}{self._file_ext}")
+
+    def _day_files(self) -> List[Tuple[date, str]]:
+        """All daily log files as (day, path), oldest first"""
+        prefix = f"{self._file_stem}-"
+        files = []
+        for name in os.listdir(self.logs_dir):
+            if not (name.startswith(prefix) and name.endswith(self._file_ext)):
+                continue
+            try:
+                day = date.fromisoformat(name[len(prefix):len(name) - len(self._file_ext)])
+            except ValueError:
+                continue
+            files.append((day, os.path.join(self.logs_dir, name)))
+        files.sort()
+        return files
+
+    def _log_files(self, days: Optional[int] = None) -> List[str]:
+        """Files that can hold rows from the last N days (all files if days is falsy), oldest first"""
+        files = [self.log_file] if os.path.isfile(self.log_file) else []
+        first_day = (datetime.now() - timedelta(days=days)).date() if days else None
+        files.extend(path for day, path in self._day_files() if first_day is None or day >= first_day)
+        return files
 
     def log_sms(self, to: str, from_number: str, text: str, rec_id: Optional[int], status: str):
         """Log SMS sending activity"""
-        timestamp = datetime.now().isoformat()
-        sent_at = datetime.now().isoformat()
+        now = datetime.now().isoformat()
 
-        log_entry = [timestamp, to, from_number, text, rec_id or "", status, sent_at]
-
-        with open(self.log_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(log_entry)
+        self._append((now, to, from_number, text, "" if rec_id is None else rec_id, status, now))
 
     def log_email(self, to: str, from_email: str, subject: str, message_id: Optional[str], status: str):
         """Log email sending activity"""
-        timestamp = datetime.now().isoformat()
-        sent_at = datetime.now().isoformat()
-
-        log_entry = [timestamp, to, from_email, subject, message_id or "", status, sent_at]
-
-        with open(self.log_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(log_entry)
+        now = datetime.now().isoformat()
+
+        self._append((now, to, from_email, subject, "" if message_id is None else message_id, status, now))
+
+    def _append(self, log_entry: tuple):
+        """Buffer a row, waking the flusher once a full batch is waiting"""
+        self._ensure_flusher()
+        with self._buffer_lock:
+            self._buffer.append(log_entry)
+            full = len(self._buffer) >= settings.log_flush_batch_size
+        if full:
+            # The write happens on the flusher thread so callers (often event loops) never block on disk
+            self._flush_wakeup.set()
+
+    def _ensure_flusher(self):
+        """Start the background flusher thread once per process (forked workers start their own)"""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._buffer_lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._flush_loop, name=f"{self.log_type}-log-flusher", daemon=True).start()
+
+    def _flush_loop(self):
+        """Write out buffered rows periodically or as soon as a full batch is waiting"""
+        while True:
+            self._flush_wakeup.wait(settings.log_flush_interval)
+            self._flush_wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing {self.log_type} logs: {e}")
+
+    def _get_fd(self, path: str) -> int:
+        """
+        Get an O_APPEND descriptor for `path`, reopening it when needed
+
+        The descriptor is reopened when the day changes, after a fork and whenever the path
+        no longer points at the open file, e.g. after a cleanup (possibly in another process)
+        removed it. Caller must hold _write_lock.
+        """
+        if self._fd is not None:
+            try:
+                if (self._fd_path == path and self._fd_pid == os.getpid()
+                        and os.stat(path).st_ino == os.fstat(self._fd).st_ino):
+                    return self._fd
+            except OSError:
+                pass
+            self._close_file()
+
+        while True:
+            try:
+                self._fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+                break
+            except FileNotFoundError:
+                self._create_file(path)
+        self._fd_pid = os.getpid()
+        self._fd_path = path
+        return self._fd
+
+    def _create_file(self, path: str):
+        """
+        Create `path` already holding the header row, unless another process got there first
+
+        The header is written to a private temp file that is then hard-linked into place, so a
+        concurrent writer can never see the file empty and add a second header or rows before it.
+        """
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            try:
+                out = io.StringIO()
+                csv.writer(out).writerow(self.columns)
+                _write_all(fd, out.getvalue().encode('utf-8'))
+            finally:
+                os.close(fd)
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def _close_file(self):
+        """Close the append descriptor (caller must hold _write_lock)"""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+        self._fd = None
+
+    def flush(self):
+        """
+        Append all buffered rows to their daily log files, one write per file
+
+        Rows are serialized by csv.writer into memory and written with one os.write on an
+        O_APPEND descriptor, so batches from the API and Celery worker processes never interleave.
+        """
+        with self._write_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            # Rows are filed by their own timestamp, so a batch that spans midnight is split
+            by_day: Dict[str, List[tuple]] = {}
+            for row in rows:
+                by_day.setdefault(row[0][:10], []).append(row)
+            for day, day_rows in by_day.items():
+                self._write_rows(self._day_file(day), day_rows)
+
+    def _write_rows(self, path: str, rows: List[tuple]):
+        """Append rows to `path` in a single write (caller holds _write_lock)"""
+        fd = self._get_fd(path)
+        out = io.StringIO()
+        csv.writer(out).writerows(rows)
+        _write_all(fd, out.getvalue().encode('utf-8'))
+        if settings.log_fsync:
+            # One sync per batch rather than per row (group commit)
+            getattr(os, 'fdatasync', os.fsync)(fd)
 
     def cleanup_old_logs(self):
         """Remove logs older than retention period"""
+        self.flush()
+
+        # Whole days past retention are dropped by unlinking their files, live rows are never rewritten
+        first_day = (datetime.now() - timedelta(days=self.retention_days)).date()
+        removed_files = 0
+        try:
+            with self._write_lock:
+                for day, path in self._day_files():
+                    if day >= first_day:
+                        break
+                    os.remove(path)
+                    removed_files += 1
+                if removed_files:
+                    self._close_file()
+        except Exception as e:
+            print(f"Error cleaning up {self.log_type} logs: {e}")
+
+        if removed_files:
+            print(f"Cleaned up {removed_files} old {self.log_type} log files")
+
+        self._cleanup_legacy_file()
+
+    def _cleanup_legacy_file(self):
+        """Expire rows of the pre-rotation single log file, removing it once nothing in it is kept"""
         if not os.path.exists(self.log_file):
             return
 
-        try:
-            with open(self.log_file, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
 
-            if len(lines) <= 1:  # Only header or empty
-                return
+        try:
+            # Stream rows into a temp file beside the log and swap it in atomically
+            with self._write_lock:
+                fd, tmp_path = tempfile.mkstemp(prefix=f".{self.log_type}_logs.", suffix=".tmp", dir=self.logs_dir)
+                removed_count = 0
+                kept_count = 0
+                try:
+                    with open(self.log_file, 'r', newline='', encoding='utf-8') as source, \
+                            os.fdopen(fd, 'w', newline='', encoding='utf-8') as target:
+                        header = source.readline()
+                        target.write(header)
+
+                        # Only the timestamp column decides retention, kept records are copied verbatim
+                        for record in _iter_raw_records(source):
+                            if not record.strip():
+                                continue
+                            if _is_expired(_record_timestamp(record), cutoff):
+                                removed_count += 1
+                                continue
+                            kept_count += 1
+                            target.write(record)
+
+                    if not kept_count:
+                        os.remove(self.log_file)
+                    elif removed_count > 0:
+                        # mkstemp creates the file 0600, keep the log's own permissions
+                        shutil.copymode(self.log_file, tmp_path)
+                        os.replace(tmp_path, self.log_file)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
 
-            cutoff_date = datetime.now() - timedelta(days=self.retention_days)
-            header = lines[0]
-            filtered_lines = [header]
-
-            for line in lines[1:]:
-                if line.strip():
-                    try:
-                        fields = line.strip().split(',')
-                        if fields and fields[0].strip('"'):
-                            record_timestamp = datetime.fromisoformat(fields[0].strip('"'))
-                            if record_timestamp >= cutoff_date:
-                                filtered_lines.append(line.strip())
-                    except (ValueError, IndexError):
-                        filtered_lines.append(line.strip())
-
-            with open(self.log_file, 'w', encoding='utf-8') as file:
-                file.write('\n'.join(filtered_lines) + '\n')
-
-            removed_count = len(lines) - len(filtered_lines)
             if removed_count > 0:
                 print(f"Cleaned up {removed_count} old {self.log_type} log entries")
 
         except Exception as e:
             print(f"Error cleaning up {self.log_type} logs: {e}")
 
-    def get_logs(self, days: int = None) -> List[Dict[str, Any]]:
-        """Get logs from the last N days as list of dictionaries"""
-        if not os.path.exists(self.log_file):
-            return []
+    def _read_logs_arrow(self, path: str, cutoff: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Read one log file with pyarrow: C-level parse of every column as a string and a vectorized cutoff filter
+
+        The file is read in record batches, so only one block of unfiltered rows is in memory at a time.
+        Returns None when the csv module has to read the file instead: pyarrow drops the "\n" of a quoted
+        "\r\n" that straddles a block boundary, and csv.writer never writes a lone "\r" itself.
+        """
+        reader = pacsv.open_csv(
+            path,
+            read_options=pacsv.ReadOptions(block_size=settings.logs_read_block_size),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={column: pa.string() for column in self.columns},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False
+            )
+        )
+        filter_by_date = cutoff is not None and 'timestamp' in reader.schema.names
+
+        logs: List[Dict[str, Any]] = []
+        for batch in reader:
+            for column in batch.columns:
+                if pc.any(pc.match_substring_regex(column, '\r([^\n]|$)')).as_py():
+                    return None
+            if filter_by_date:
+                timestamps = batch.column('timestamp')
+                # Same rule as _is_expired: only well-formed isoformat strings are compared, others are kept
+                expired = pc.and_(
+                    pc.and_(pc.greater_equal(pc.utf8_length(timestamps), 19), pc.string_is_ascii(timestamps)),
+                    pc.and_(pc.equal(pc.utf8_slice_codeunits(timestamps, 10, 11), 'T'), pc.less(timestamps, cutoff))
+                )
+                batch = batch.filter(pc.invert(expired))
+            logs.extend(batch.to_pylist())
+        return logs
 
+    def get_logs(self, days: int = None) -> List[Dict[str, Any]]:
+        """Get logs from the last N days as list of dictionaries (materialized iter_logs)"""
+        if pacsv is not None:
+            cutoff = (datetime.now() - timedelta(days=days)).isoformat() if days else None
+            try:
+                logs: Optional[List[Dict[str, Any]]] = []
+                for path in self._log_files(days):
+                    if not os.path.getsize(path):
+                        continue
+                    file_logs = self._read_logs_arrow(path, cutoff)
+                    if file_logs is None:
+                        logs = None
+                        break
+                    logs.extend(file_logs)
+                if logs is not None:
+                    return logs
+            except Exception as e:
+                print(f"Error reading {self.log_type} logs with pyarrow, falling back to csv: {e}")
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                logs = list(reader)
-
-            if not logs:
-                return []
-
-            if days:
-                cutoff_date = datetime.now() - timedelta(days=days)
-                filtered_logs = []
-
-                for log in logs:
-                    try:
-                        record_timestamp = datetime.fromisoformat(log.get('timestamp', '').strip('"'))
-                        if record_timestamp >= cutoff_date:
-                            filtered_logs.append(log)
-                    except (ValueError, KeyError):
-                        filtered_logs.append(log)
-
-                return filtered_logs
-
-            return logs
-
+            return list(self.iter_logs(days))
         except Exception as e:
             print(f"Error reading {self.log_type} logs: {e}")
             return []
 
+    def iter_logs(self, days: int = None) -> Iterator[Dict[str, Any]]:
+        """Yield logs from the last N days one row at a time, opening only the daily files in range"""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat() if days else None
+
+        for path in self._log_files(days):
+            try:
+                file = open(path, 'r', newline='', encoding='utf-8')
+            except FileNotFoundError:
+                # Removed by a concurrent cleanup
+                continue
+            with file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if not header:
+                    continue
+                # Filter on the raw timestamp column, dicts are built only for rows that are kept
+                ts_index = header.index('timestamp') if cutoff and 'timestamp' in header else None
+                for row in reader:
+                    if not row:
+                        continue
+                    if ts_index is not None and ts_index < len(row) and _is_expired(row[ts_index], cutoff):
+                        continue
+                    yield dict(zip(header, row))
+
+    def get_logs_cached(self, days: int = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get logs through a TTL cache that is invalidated whenever one of the CSV files in range changes
+
+        The `days` cutoff is taken when an entry is built, so a hit may still include rows that
+        crossed the cutoff since; that staleness is bounded by logs_cache_ttl and accepted.
+
+        Returns:
+            Tuple of (logs, cache_hit)
+        """
+        signature = []
+        for path in self._log_files(days):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        if not signature:
+            return [], False
+        signature = tuple(signature)
+        now = time.monotonic()
+
+        with self._cache_lock:
+            cached = self._logs_cache.get(days)
+            if cached and cached[0] == signature and now - cached[1] < settings.logs_cache_ttl:
+                self._logs_cache.move_to_end(days)
+                self.cache_hits += 1
+                return cached[2], True
+
+        logs = self.get_logs(days)
+
+        with self._cache_lock:
+            self._logs_cache[days] = (signature, now, logs)
+            self._logs_cache.move_to_end(days)
+            while len(self._logs_cache) > settings.logs_cache_max_entries:
+                self._logs_cache.popitem(last=False)
+            self.cache_misses += 1
+
+        return logs, False
+
 
 # Global logger instances
 sms_logger = SimpleCSVLogger("sms")
 email_logger = SimpleCSVLogger("email")
 
 
+@atexit.register
+def flush_all_logs():
+    """Write out any rows still buffered by the SMS and Email loggers"""
+    sms_logger.flush()
+    email_logger.flush()
+
+
 def cleanup_all_logs():
     """Cleanup old logs for SMS and Email"""
     sms_logger.cleanup_old_logs()
@@ -0,0 +1,14 @@
+import asyncio
+
+# uvloop when installed (uvicorn already runs the API on it), otherwise the default asyncio loop
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create an event loop for a long-lived background send loop"""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
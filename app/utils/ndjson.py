@@ -0,0 +1,9 @@
+from typing import Any, Dict, Iterable, Iterator
+
+import orjson
+
+
+def stream_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON, one row per chunk"""
+    for row in rows:
+        yield orjson.dumps(row) + b"\n"
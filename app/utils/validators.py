@@ -1,6 +1,21 @@
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Annotated, Optional
 from email_validator import validate_email as email_validator, EmailNotValidError
+from pydantic import BeforeValidator, StringConstraints
+from pydantic_core import PydanticCustomError
+
+# Formatting characters stripped from phone numbers before validation; the translate table covers
+# ASCII input in one C-level pass, the regex also catches Unicode whitespace
+_PHONE_CLEAN_RE = re.compile(r'[\s\-\(\)]')
+_PHONE_STRIP_TABLE = str.maketrans('', '', ' \t\n\r\f\v\x1c\x1d\x1e\x1f-()')
+
+# Length limits of a phone field as submitted, i.e. before formatting characters are stripped
+PHONE_MIN_LENGTH = 10
+PHONE_MAX_LENGTH = 20
+
+# Recipients repeat (retries, bulk sends), so phone and email syntax results are memoized per input string
+_PHONE_CACHE_SIZE = 4096
 
 
 class PhoneValidator:
@@ -18,51 +33,56 @@ class PhoneValidator:
         r'^\+?[1-9]\d{1,14}$'    # General international format
     ]
 
+    # All patterns fused into one alternation so validation is a single match
+    PHONE_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in PATTERNS))
+
     @staticmethod
+    @lru_cache(maxsize=_PHONE_CACHE_SIZE)
     def clean_phone_number(phone: str) -> str:
         """Clean phone number by removing formatting characters"""
-        return re.sub(r'[\s\-\(\)]', '', phone)
+        clean_phone = phone.translate(_PHONE_STRIP_TABLE)
+        return clean_phone if clean_phone.isascii() else _PHONE_CLEAN_RE.sub('', clean_phone)
 
     @staticmethod
+    @lru_cache(maxsize=_PHONE_CACHE_SIZE)
     def is_valid_phone_number(phone: str) -> bool:
         """Validate phone number format"""
-        clean_phone = PhoneValidator.clean_phone_number(phone)
-        return any(re.match(pattern, clean_phone) for pattern in PhoneValidator.PATTERNS)
+        return _is_valid_clean_phone(PhoneValidator.clean_phone_number(phone))
 
     @staticmethod
+    @lru_cache(maxsize=_PHONE_CACHE_SIZE)
     def convert_phone_for_melipayamak(phone: str) -> str:
 
         clean_phone = PhoneValidator.clean_phone_number(phone)
-        
-        # Convert 98xxxxxxxxxx to 09xxxxxxxxx (Iranian mobile: 98 + 10 digits = 12 chars total)
-        if re.match(r'^98[0-9]{10}$', clean_phone):
+        length = len(clean_phone)
+
+        # Every Iranian format below is ASCII digits after an optional leading +
+        if clean_phone[:1] == '+':
+            if length == 13 and clean_phone.startswith('+98') and _is_ascii_digits(clean_phone[1:]):
+                # Convert +98xxxxxxxxxx to 09xxxxxxxxx: remove +98 and add 09: '09' + digits[1:]
+                return '09' + clean_phone[4:]
+            return clean_phone
+        if not _is_ascii_digits(clean_phone):
+            return clean_phone
+
+        if clean_phone.startswith('98'):
+            # Convert 98xxxxxxxxxx to 09xxxxxxxxx (Iranian mobile: 98 + 10 digits = 12 chars total)
             # For Iranian mobile numbers: 989xxxxxxxxx should become 09xxxxxxxxx
-            # Remove 989 prefix and add 09 prefix: '09' + digits[3:]
-            return '09' + clean_phone[3:]
-        
-        # For 98xxxxxxxxxxx format (11 digits after 98), return as is
-        # This format works directly with Melipayamak API
-        if re.match(r'^98[0-9]{11}$', clean_phone):
+            if length == 12:
+                return '09' + clean_phone[3:]
+            # For 98xxxxxxxxxxx format (11 digits after 98), return as is
+            # This format works directly with Melipayamak API
             return clean_phone
-        
-        # Convert +98xxxxxxxxxx to 09xxxxxxxxx
-        if re.match(r'^\+98[0-9]{10}$', clean_phone):
-            # For +989xxxxxxxxx, remove +98 and add 09: '09' + digits[1:]
-            return '09' + clean_phone[4:]
-        
-        # Convert 0098xxxxxxxxxx to 09xxxxxxxxx
-        if re.match(r'^0098[0-9]{10}$', clean_phone):
-            # For 00989xxxxxxxxx, remove 0098 and add 09: '09' + digits[1:]
+
+        # Convert 0098xxxxxxxxxx to 09xxxxxxxxx: remove 0098 and add 09: '09' + digits[1:]
+        if length == 14 and clean_phone.startswith('0098'):
             return '09' + clean_phone[5:]
-        
-        # If already in 09xxxxxxxxx format, return as is
-        if re.match(r'^09[0-9]{9}$', clean_phone):
-            return clean_phone
-        
-        # Handle 09xxxxxxxxxx format (12 digits total) - remove last digit
-        if re.match(r'^09[0-9]{10}$', clean_phone):
+
+        # Handle 09xxxxxxxxxx format (12 digits total) - remove last digit;
+        # 09xxxxxxxxx (11 digits) is already in the right format
+        if length == 12 and clean_phone.startswith('09'):
             return clean_phone[:-1]
-        
+
         # For other formats, return as is (let validation handle it)
         return clean_phone
 
@@ -70,11 +90,59 @@ class PhoneValidator:
     def validate_phone_number(phone: str, field_name: str = "phone number") -> str:
         """Validate and clean phone number, raise ValueError if invalid"""
         clean_phone = PhoneValidator.clean_phone_number(phone)
-        if not PhoneValidator.is_valid_phone_number(clean_phone):
+        # Already cleaned, check it directly instead of cleaning again in is_valid_phone_number
+        if not _is_valid_clean_phone(clean_phone):
             raise ValueError(f"Invalid {field_name} format: {phone}")
         return clean_phone
 
 
+def _is_ascii_digits(value: str) -> bool:
+    """Whether a string is non-empty and only 0-9"""
+    return value.isascii() and value.isdigit()
+
+
+def _is_valid_clean_phone(phone: str) -> bool:
+    """
+    String-op equivalent of PhoneValidator.PHONE_RE for a cleaned number
+
+    Only the 0-prefixed Iranian forms (0098..., 09...) fall outside the general
+    international pattern, every other listed format is a special case of it.
+    """
+    if phone[:1] == '+':
+        digits = phone[1:]
+        return 2 <= len(digits) <= 15 and digits[0] in '123456789' and digits.isdecimal()
+    if phone[:1] == '0':
+        if not (phone.isascii() and phone.isdigit()):
+            return False
+        if phone.startswith('0098'):
+            return len(phone) == 14
+        return phone.startswith('09') and len(phone) in (11, 12)
+    return 2 <= len(phone) <= 15 and phone[0] in '123456789' and phone.isdecimal()
+
+
+def _clean_phone_input(value):
+    """Check the raw length, then strip formatting characters before pydantic-core checks the phone pattern"""
+    if not isinstance(value, str):
+        return value
+    if len(value) < PHONE_MIN_LENGTH:
+        raise PydanticCustomError(
+            'string_too_short', 'String should have at least {min_length} characters', {'min_length': PHONE_MIN_LENGTH}
+        )
+    if len(value) > PHONE_MAX_LENGTH:
+        raise PydanticCustomError(
+            'string_too_long', 'String should have at most {max_length} characters', {'max_length': PHONE_MAX_LENGTH}
+        )
+    return PhoneValidator.clean_phone_number(value)
+
+
+# Phone number field: raw length checked and formatting stripped in Python, fused pattern checked in pydantic-core
+PhoneStr = Annotated[
+    str,
+    StringConstraints(pattern=PhoneValidator.PHONE_RE.pattern),
+    BeforeValidator(_clean_phone_input)
+]
+
+
 def validate_sms_text(text: str) -> str:
     """Validate and clean SMS text"""
     if not text or not text.strip():
@@ -91,19 +159,22 @@ class EmailValidator:
     """Centralized email validation utility"""
 
     @staticmethod
+    @lru_cache(maxsize=_PHONE_CACHE_SIZE)
     def validate_email(email: str, field_name: str = "email address") -> str:
-        """Validate email address, raise ValueError if invalid"""
+        """Validate email address syntax, raise ValueError if invalid"""
         try:
-            validated_email = email_validator(email)
+            # Syntax only, deliverability would need blocking DNS lookups
+            validated_email = email_validator(email, check_deliverability=False)
             return validated_email.email
         except EmailNotValidError as e:
             raise ValueError(f"Invalid {field_name}: {str(e)}")
 
     @staticmethod
+    @lru_cache(maxsize=_PHONE_CACHE_SIZE)
     def is_valid_email(email: str) -> bool:
-        """Check if email address is valid"""
+        """Check if email address syntax is valid"""
         try:
-            email_validator(email)
+            email_validator(email, check_deliverability=False)
             return True
         except EmailNotValidError:
             return False